@@ -0,0 +1,493 @@
+"""Application core shared by the main.py, main_local.py and sample.py presets.
+
+`create_app(AppConfig(...))` builds the FastAPI app. Storage (durable or
+in-memory leave ledger), routing (rules before or after the model), the rule
+engine and the inference backend are all chosen by the config.
+"""
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from employee_ingest import load_employee_frame, SUPPORTED_EXTENSIONS
+from inference_backends import BACKENDS
+from inference_pool import PooledBackend
+from inference_queue import InferenceQueue, LoadShed
+from leave_analytics import LeaveAnalytics
+from leave_ledger import LeaveLedger, as_number, employee_key
+from policy_compiler import PolicyRules, compile_policy
+from prompt_cache import PromptFragmentCache
+from rule_engine import (analyze_leave_request, date_rejection, parse_question_date, pending_tasks_rejection,
+                         validate_response)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class AppConfig(BaseModel):
+    allow_origins: List[str] = ["http://localhost:3000"]
+    inference_backend: str = "extractive_qa"   # see inference_backends.BACKENDS
+    model_names: List[str] = []                # empty = the backend's defaults
+    routing: str = "rules_first"               # or "model_first"
+    rule_engine: bool = True
+    ledger_dir: Optional[str] = None           # None keeps leave applications in memory
+    snapshot_every: int = 10000
+    latency_budget_ms: int = 3000
+    inference_workers: int = 1
+    max_queue_depth: int = 8
+    inference_replicas: int = 0                # >0 runs the model in that many pinned worker processes
+    threads_per_replica: int = 1
+    replica_cpus: List[List[int]] = []         # cores per replica; empty = spread over available cores
+
+    @classmethod
+    def from_env(cls, **preset) -> "AppConfig":
+        """Preset values, overridable per deployment through environment variables"""
+        env = {
+            "inference_backend": os.getenv("INFERENCE_BACKEND"),
+            "ledger_dir": os.getenv("LEAVE_LEDGER_DIR"),
+            "snapshot_every": os.getenv("LEAVE_LEDGER_SNAPSHOT_EVERY"),
+            "latency_budget_ms": os.getenv("ASK_LATENCY_BUDGET_MS"),
+            "inference_workers": os.getenv("INFERENCE_WORKERS"),
+            "max_queue_depth": os.getenv("INFERENCE_MAX_QUEUE_DEPTH"),
+            "inference_replicas": os.getenv("INFERENCE_REPLICAS"),
+            "threads_per_replica": os.getenv("INFERENCE_THREADS_PER_REPLICA"),
+            "replica_cpus": parse_cpu_sets(os.getenv("INFERENCE_REPLICA_CPUS")),
+        }
+        values = {"ledger_dir": os.path.join(BACKEND_DIR, "ledger_data"), **preset}
+        values.update({key: value for key, value in env.items() if value is not None})
+        return cls(**values)
+
+
+def parse_cpu_sets(value: Optional[str]) -> Optional[List[List[int]]]:
+    """"0,1;2,3" -> [[0, 1], [2, 3]] (one core list per replica)"""
+    if not value:
+        return None
+    return [[int(cpu) for cpu in group.split(",") if cpu.strip()] for group in value.split(";") if group.strip()]
+
+
+class Query(BaseModel):
+    employee_name: str
+    question: str
+    deadline_ms: Optional[int] = None
+
+
+class LeaveApplication(BaseModel):
+    employee_name: str
+    leave_type: str
+    days: float = 1
+    leave_date: str = ""
+
+
+class LeaveAssistant:
+    """Uploaded data, derived indexes and the model backend for one app instance"""
+
+    def __init__(self, config: AppConfig):
+        if config.inference_backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend '{config.inference_backend}'. Use one of: {', '.join(BACKENDS)}.")
+        self.config = config
+        self.employee_data: List[Dict[str, Any]] = []
+        self.employee_names: List[str] = []
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self.policy_text = ""
+        self.policy_rules = PolicyRules()
+        self.policy_report: List[Dict[str, Any]] = []
+
+        # Leave applications are appended here; balances = uploaded baseline + ledger deltas.
+        # Opened by open(), see there.
+        self.ledger: Optional[LeaveLedger] = None
+        # Department/BU/country/city aggregates, rebuilt per upload and kept current by ledger changes
+        self.analytics = LeaveAnalytics()
+        # Formatted employee summaries (and token IDs once a tokenizer is available)
+        self.prompt_cache = PromptFragmentCache(lambda emp: self.ledger.live_record(emp))
+
+        backend_cls = BACKENDS[config.inference_backend]
+        if config.inference_replicas > 0 and backend_cls.name != "none":
+            self.backend = PooledBackend(backend_cls, config.model_names, config.inference_replicas,
+                                         config.threads_per_replica, config.replica_cpus or None)
+        else:
+            self.backend = backend_cls(config.model_names)
+        # One queue worker per replica so every replica can be kept busy
+        workers = max(config.inference_workers, config.inference_replicas)
+        self.inference_queue = InferenceQueue(workers=workers, max_depth=config.max_queue_depth)
+
+    def open(self):
+        """Open the leave ledger. Runs from the app lifespan, not create_app: model replica
+        processes re-import the entry module and must not recover or append to the ledger."""
+        self.ledger = LeaveLedger(self.config.ledger_dir, snapshot_every=self.config.snapshot_every)
+        self.ledger.add_listener(self.analytics.update_row)
+        self.ledger.add_listener(self.prompt_cache.invalidate)
+
+    def close(self):
+        """Flush the ledger and stop model replica processes"""
+        if self.ledger is not None:
+            self.ledger.close()
+        if isinstance(self.backend, PooledBackend):
+            self.backend.pool.close()
+
+    def load_model(self):
+        """Load the configured backend; /ask is served by rules until it is ready"""
+        if self.backend.name == "none":
+            return
+        print(f"🤖 Loading {self.backend.name} model in the background...")
+        if self.backend.load() and self.backend.uses_token_ids:
+            self.prompt_cache.set_tokenizer(self.backend.tokenizer)
+
+    def publish_employees(self, df, ledger_covers_seq: Optional[int] = None):
+        """Make df the live roster. Recorded leave stays applied on top of it, except
+        transactions up to ledger_covers_seq, which HR says the export already includes."""
+        if ledger_covers_seq is not None:
+            self.ledger.rebase(ledger_covers_seq)  # ValueError leaves the current roster in place
+        records = df.to_dict(orient="records")
+        by_name = {}
+        for emp in records:
+            by_name.setdefault(str(emp.get("name", "")).lower().strip(), emp)
+        names = sorted({emp["name"].strip() for emp in records
+                        if isinstance(emp.get("name"), str) and emp["name"].strip()})
+
+        self.employee_data, self._by_name, self.employee_names = records, by_name, names
+
+        # Aggregate once per dataset version, then fold in leave already recorded in the
+        # ledger. Each ledger key is applied once, to the row find_employee returns (the
+        # first row for a name), under the ledger lock so a concurrent /apply lands
+        # either before the build or after the fold, never in both.
+        first_rows = {}
+        for emp in list(by_name.values()) + records:
+            first_rows.setdefault(employee_key(emp), emp)
+
+        def build_analytics(recorded):
+            version = self.analytics.build(df)
+            for key, deltas in recorded.items():
+                if key in first_rows and deltas:
+                    self.analytics.update_row(first_rows[key], {}, deltas)
+            return version
+
+        dataset_version = self.ledger.with_recorded(build_analytics)
+        print(f"📈 Built leave analytics (dataset version {dataset_version})")
+        self.prompt_cache.publish(records)
+
+    def publish_policy(self, policy_text: str):
+        # Compile the policy's concrete numbers into rule parameters for the rule engine
+        self.policy_text = policy_text
+        self.policy_rules, self.policy_report = compile_policy(policy_text)
+        self.prompt_cache.set_policy(policy_text)
+        print(f"📐 Recognized {len(self.policy_report)} policy rules: {[r['rule'] for r in self.policy_report]}")
+
+    def find_employee(self, name: str) -> Optional[Dict[str, Any]]:
+        """Find employee by name with fuzzy matching"""
+        if not name or not name.strip():
+            return None
+
+        name_lower = name.lower().strip()
+
+        # Exact match first
+        employee = self._by_name.get(name_lower)
+        if employee is not None:
+            return employee
+
+        # Partial match
+        for emp_name, emp in self._by_name.items():
+            if name_lower in emp_name or emp_name in name_lower:
+                return emp
+
+        return None
+
+    def rule_answer(self, employee: Dict[str, Any], question: str) -> Optional[str]:
+        if not self.config.rule_engine:
+            return None
+        return analyze_leave_request(employee, question, self.policy_text, self.policy_rules, self.ledger)
+
+    def info_answer(self, employee: Dict[str, Any], question: str) -> str:
+        """Structured employee info block with guidance, used when the model gives no answer"""
+        emp_info = self.prompt_cache.get(employee).info_block
+
+        question_lower = question.lower()
+        guidance = ""
+
+        if any(word in question_lower for word in ['balance', 'left', 'remaining']):
+            guidance = "\n\n💡 For leave balance queries, check the 'Leave Balance', 'Carry Forward' fields above."
+        elif any(word in question_lower for word in ['apply', 'take', 'request']):
+            guidance = "\n\n💡 For leave applications, ensure you have sufficient balance and the date is not a weekend/holiday."
+        elif any(word in question_lower for word in ['policy', 'rule', 'eligible']):
+            guidance = "\n\n💡 For policy questions, please refer to your company's leave policy document or consult HR."
+
+        return f"👤 **Employee Information for {employee.get('name', 'Unknown')}:**\n\n{emp_info}{guidance}"
+
+    async def model_answer(self, employee: Dict[str, Any], query: Query, request: Request) -> Optional[str]:
+        """Ask the model within the request's latency budget; raises LoadShed when it cannot"""
+        if not self.backend.loaded:
+            return None
+        # Callers may ask for a tighter deadline than the server's budget, never a looser one
+        budget = min(query.deadline_ms or self.config.latency_budget_ms, self.config.latency_budget_ms) / 1000
+        ai_response = await self.inference_queue.run(
+            self.backend.answer,
+            query.question,
+            self.prompt_cache.get(employee),
+            self.prompt_cache,
+            deadline=time.time() + budget,
+            budget=budget,
+            abandoned=request.is_disconnected,
+        )
+        if not ai_response or len(ai_response.strip()) <= 5:
+            return None
+        if self.config.rule_engine:
+            return validate_response(ai_response, employee, query.question, self.policy_text, self.policy_rules, self.ledger)
+        return ai_response.strip()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "employees_loaded": len(self.employee_data),
+            "policy_loaded": len(self.policy_text) > 0,
+            "policy_length": len(self.policy_text),
+            "policy_rules": self.policy_rules.dict(),
+            "policy_rules_recognized": [r["rule"] for r in self.policy_report],
+            "inference_backend": self.backend.name,
+            "ai_model_loaded": self.backend.loaded,
+            "routing": self.config.routing,
+            "leave_ledger": self.ledger.stats(),
+            "inference_queue": self.inference_queue.stats(),
+            "inference_pool": self.backend.pool.stats() if isinstance(self.backend, PooledBackend) else None,
+            "prompt_cache": self.prompt_cache.stats(),
+            "system_status": "✅ Ready" if self.employee_data and self.policy_text else "⚠️  Waiting for file upload"
+        }
+
+
+def read_policy_text(filename: str, policy_bytes: bytes) -> Optional[str]:
+    """Extract text from a PDF or plain-text policy file (None if unsupported)"""
+    if filename.endswith(".pdf"):
+        import fitz  # PyMuPDF for PDF extraction
+
+        try:
+            pdf_doc = fitz.open(stream=policy_bytes, filetype="pdf")
+            policy_text = "".join(page.get_text() for page in pdf_doc)
+            print(f"✅ Extracted {len(policy_text)} characters from {pdf_doc.page_count} pages")
+            pdf_doc.close()
+            return policy_text
+        except Exception as pdf_error:
+            print(f"❌ PDF processing error: {pdf_error}")
+            return "Policy document could not be processed."
+    if filename.endswith(".txt"):
+        policy_text = policy_bytes.decode("utf-8", errors="ignore")
+        print(f"✅ Read {len(policy_text)} characters of policy text")
+        return policy_text
+    return None
+
+
+def create_app(config: AppConfig) -> FastAPI:
+    assistant = LeaveAssistant(config)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        assistant.open()
+        # Load the model off the startup path so the server accepts requests immediately
+        threading.Thread(target=assistant.load_model, name="model-loader", daemon=True).start()
+        yield
+        assistant.close()
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.assistant = assistant
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=config.allow_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.post("/upload")
+    async def upload_files(emp_file: UploadFile = File(...), policy_file: UploadFile = File(...),
+                           ledger_covers_seq: Optional[int] = Form(None)):
+        try:
+            print(f"📁 Processing employee file: {emp_file.filename}")
+
+            # Process employee file (CSV, Excel, JSON/NDJSON, Parquet or Arrow IPC);
+            # column names are standardized on the schema while loading
+            if not emp_file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                return JSONResponse(status_code=400, content={"error": "Unsupported employee file format. Use CSV, Excel, JSON/NDJSON, Parquet or Arrow."})
+            df = load_employee_frame(emp_file.filename, await emp_file.read())
+
+            print(f"📊 Cleaned columns: {list(df.columns)}")
+
+            # Validate required columns
+            if "name" not in df.columns:
+                available_cols = [col for col in df.columns if 'name' in col.lower()]
+                error_msg = f"Missing 'name' column in employee data. Available columns: {list(df.columns)}"
+                if available_cols:
+                    error_msg += f". Did you mean: {available_cols}?"
+                return JSONResponse(status_code=400, content={"error": error_msg})
+
+            # Filter out empty names and clean data
+            df = df[df["name"].notna()]
+            df = df[df["name"].astype(str).str.strip() != ""]
+
+            # Fill NaN values with empty strings for better handling
+            df = df.fillna('')
+
+            # Process policy file before publishing, so a bad upload leaves the old data in place
+            print(f"📋 Processing policy file: {policy_file.filename}")
+            policy_text = read_policy_text(policy_file.filename, await policy_file.read())
+            if policy_text is None:
+                return JSONResponse(status_code=400, content={"error": "Policy file must be a PDF or text file."})
+
+            try:
+                assistant.publish_employees(df, ledger_covers_seq)
+            except ValueError as rejected:
+                return JSONResponse(status_code=400, content={"error": f"❌ {rejected}"})
+            assistant.publish_policy(policy_text)
+
+            print(f"✅ Loaded {len(assistant.employee_data)} employees")
+            print(f"📝 Sample employees: {[e.get('name') for e in assistant.employee_data[:3]]}")
+
+            return {
+                "message": f"✅ Files uploaded successfully! Loaded {len(assistant.employee_data)} employees and policy document ({len(policy_text)} characters).",
+                "policy_rules": assistant.policy_report,
+            }
+
+        except Exception as e:
+            print(f"❌ Upload error: {str(e)}")
+            return JSONResponse(status_code=500, content={"error": f"Upload failed: {str(e)}"})
+
+    @app.get("/employees")
+    def get_employees():
+        # Sorted unique names are computed once per upload
+        print(f"👥 Available employees: {len(assistant.employee_names)}")
+        return assistant.employee_names
+
+    @app.get("/status")
+    def get_status():
+        """Get system status"""
+        return assistant.status()
+
+    @app.post("/ask")
+    async def ask_question(query: Query, request: Request):
+        try:
+            print(f"❓ Question from {query.employee_name}: {query.question}")
+
+            # Validate inputs
+            if not query.employee_name or not query.employee_name.strip():
+                return JSONResponse(status_code=400, content={"answer": "❌ Employee name is required."})
+
+            if not query.question or not query.question.strip():
+                return JSONResponse(status_code=400, content={"answer": "❌ Question is required."})
+
+            if query.deadline_ms is not None and query.deadline_ms <= 0:
+                return JSONResponse(status_code=400, content={"answer": "❌ deadline_ms must be a positive number of milliseconds."})
+
+            # Check if data is loaded
+            if not assistant.employee_data:
+                return JSONResponse(status_code=400, content={"answer": "❌ No employee data loaded. Please upload employee file first."})
+
+            # Find employee
+            employee = assistant.find_employee(query.employee_name)
+            if not employee:
+                available_employees = assistant.employee_names[:10]
+                return JSONResponse(
+                    status_code=404,
+                    content={"answer": f"❌ Employee '{query.employee_name}' not found.\n\n📋 Available employees include:\n" + "\n".join([f"• {name}" for name in available_employees])}
+                )
+
+            print(f"👤 Found employee: {employee.get('name')}")
+
+            # Use rule-based analysis first (more reliable)
+            if config.routing == "rules_first":
+                rule_based_answer = assistant.rule_answer(employee, query.question)
+                if rule_based_answer:
+                    print("✅ Used rule-based response")
+                    return {"answer": rule_based_answer}
+
+            try:
+                model_response = await assistant.model_answer(employee, query, request)
+                if model_response:
+                    print(f"✅ {assistant.backend.name} model response: {model_response[:100]}...")
+                    return {"answer": model_response}
+            except LoadShed as shed:
+                print(f"⏱️  Shed model call ({shed.reason}), answering from rules/employee data")
+                return {
+                    "answer": assistant.rule_answer(employee, query.question) or assistant.info_answer(employee, query.question),
+                    "degraded": True,
+                    "degraded_reason": shed.reason,
+                }
+            except Exception as ai_error:
+                print(f"❌ Model error: {ai_error}")
+                print("🔄 Falling back to rule-based system...")
+
+            if config.routing == "model_first":
+                rule_based_answer = assistant.rule_answer(employee, query.question)
+                if rule_based_answer:
+                    return {"answer": rule_based_answer}
+
+            # Final fallback: return structured employee info with guidance
+            return {"answer": assistant.info_answer(employee, query.question)}
+
+        except Exception as e:
+            print(f"❌ Error in /ask: {str(e)}")
+            return JSONResponse(status_code=500, content={"answer": f"❌ Sorry, I encountered an error: {str(e)}. Please try again."})
+
+    @app.post("/apply")
+    def apply_leave(application: LeaveApplication):
+        """Record a leave application in the ledger (blocks until it is durable)"""
+        try:
+            if not assistant.employee_data:
+                return JSONResponse(status_code=400, content={"error": "❌ No employee data loaded. Please upload employee file first."})
+
+            employee = assistant.find_employee(application.employee_name)
+            if not employee:
+                return JSONResponse(status_code=404, content={"error": f"❌ Employee '{application.employee_name}' not found."})
+
+            leave_date = None
+            pending_tasks = as_number(employee.get('pending_tasks', 0))
+            if application.leave_date:
+                date_obj = parse_question_date(application.leave_date)
+                if date_obj is None:
+                    return JSONResponse(status_code=400, content={"error": "⚠️  Could not parse the date. Please use format DD/MM/YYYY or DD-MM-YYYY."})
+                rejection = date_rejection(date_obj, assistant.policy_rules, pending_tasks)
+                leave_date = date_obj.strftime("%Y-%m-%d")
+            else:
+                rejection = pending_tasks_rejection(assistant.policy_rules, pending_tasks)
+            if rejection:
+                return JSONResponse(status_code=400, content={"error": rejection})
+
+            try:
+                txn = assistant.ledger.apply_leave(employee, application.leave_type, application.days, leave_date)
+            except ValueError as rejected:
+                return JSONResponse(status_code=400, content={"error": f"❌ {rejected}"})
+
+            live = assistant.ledger.live_record(employee)
+            balances = {col: live[col] for col in txn["deltas"] if col in live}
+            print(f"📒 Recorded {txn['days']} day(s) of {txn['leave_type'].upper()} for {employee.get('name')} (txn {txn['seq']})")
+            return {
+                "message": f"✅ Recorded {txn['days']} day(s) of {txn['leave_type'].upper()} leave for {employee.get('name')}.",
+                "transaction": txn,
+                "balances": balances,
+            }
+
+        except Exception as e:
+            print(f"❌ Error in /apply: {str(e)}")
+            return JSONResponse(status_code=500, content={"error": f"Leave application failed: {str(e)}"})
+
+    @app.get("/analytics")
+    def get_analytics(group_by: str = None, group: str = None):
+        """Precomputed leave aggregates by department, business unit, country or city"""
+        try:
+            if not assistant.employee_data:
+                return JSONResponse(status_code=400, content={"error": "❌ No employee data loaded. Please upload employee file first."})
+            if group_by:
+                group_by = group_by.strip().lower().replace(' ', '_').replace('-', '_')
+            return assistant.analytics.query(group_by, group)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"error": f"❌ {e}"})
+        except KeyError as e:
+            return JSONResponse(status_code=404, content={"error": f"❌ {e.args[0]}"})
+        except Exception as e:
+            print(f"❌ Error in /analytics: {str(e)}")
+            return JSONResponse(status_code=500, content={"error": str(e)})
+
+    @app.get("/")
+    def read_root():
+        return {"message": "🚀 Employee Leave Management API is running!", "status": "healthy"}
+
+    return app
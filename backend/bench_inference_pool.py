@@ -0,0 +1,100 @@
+"""Throughput of the extractive-QA model for replica x thread layouts on this machine.
+
+Each layout starts an InferencePool, warms it up, then keeps every replica
+busy from client threads and reports answers/s and latency percentiles.
+The in-process single-model baseline is "1x<all cores>".
+
+    python bench_inference_pool.py --replicas 1,2,4 --threads 1,2,4 --requests 400
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from employee_ingest import load_employee_frame
+from inference_backends import ExtractiveQABackend
+from inference_pool import InferencePool, available_cpus
+from prompt_cache import PromptFragmentCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "..", "data")
+QUESTIONS = [
+    "How many privilege leaves do I have left?",
+    "When did I last take leave?",
+    "Which department am I in?",
+    "Who is my manager?",
+]
+
+
+def run_layout(model, snapshots, replicas: int, threads: int, requests: int):
+    pool = InferencePool(ExtractiveQABackend, [model], replicas=replicas, threads_per_replica=threads)
+    try:
+        if not pool.start():
+            return None
+        for fragment, snapshot in snapshots[:replicas * 2]:
+            pool.submit(QUESTIONS[0], fragment, snapshot).result()
+
+        def one(i):
+            fragment, snapshot = snapshots[i % len(snapshots)]
+            started = time.perf_counter()
+            pool.submit(QUESTIONS[i % len(QUESTIONS)], fragment, snapshot).result()
+            return time.perf_counter() - started
+
+        # Two clients per replica keep one request queued behind each running one
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=replicas * 2) as clients:
+            latencies = sorted(clients.map(one, range(requests)))
+        elapsed = time.perf_counter() - started
+        return {
+            "throughput": requests / elapsed,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        }
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    cores = len(available_cpus())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= cores))
+    parser.add_argument("--threads", default=",".join(str(n) for n in (1, 2, 4) if n <= cores) + f",{cores}")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--model", default="distilbert-base-uncased-distilled-squad")
+    args = parser.parse_args()
+
+    from transformers import AutoTokenizer
+
+    with open(os.path.join(DATA_DIR, "emp_data_updated.csv"), "rb") as f:
+        df = load_employee_frame("emp_data_updated.csv", f.read())
+    employees = df.fillna('').to_dict(orient="records")
+    with open(os.path.join(HERE, "..", "policy.txt"), encoding="utf-8") as f:
+        policy = f.read()
+
+    cache = PromptFragmentCache(lambda emp: emp, tokenizer=AutoTokenizer.from_pretrained(args.model))
+    cache.publish(employees)
+    cache.set_policy(policy)
+    random.seed(0)
+    snapshots = [(fragment, cache.snapshot(fragment))
+                 for fragment in (cache.get(emp) for emp in random.sample(employees, min(64, len(employees))))]
+
+    results = {}
+    for replicas in sorted({int(n) for n in args.replicas.split(",")}):
+        for threads in sorted({int(n) for n in args.threads.split(",")}):
+            if replicas * threads > cores and not (replicas == 1 and threads == cores):
+                continue  # oversubscribed layouts only measure contention
+            result = run_layout(args.model, snapshots, replicas, threads, args.requests)
+            if result is None:
+                print(f"{replicas}x{threads}: model failed to load")
+                continue
+            results[(replicas, threads)] = result
+            print(f"{replicas}x{threads}: {result['throughput']:.1f} answers/s  "
+                  f"p50 {result['p50_ms']:.0f} ms  p99 {result['p99_ms']:.0f} ms")
+
+    if results:
+        (replicas, threads), best = max(results.items(), key=lambda item: item[1]["throughput"])
+        print(f"\ncores={cores} best layout: {replicas} replica(s) x {threads} thread(s) "
+              f"= {best['throughput']:.1f} answers/s")
+        print(f"INFERENCE_REPLICAS={replicas} INFERENCE_THREADS_PER_REPLICA={threads}")
@@ -0,0 +1,132 @@
+"""Employee file ingestion benchmark.
+
+Builds a synthetic roster (rows resampled from data/emp_data_updated.csv)
+and writes it once per format in a subprocess, then loads each file through
+load_employee_frame in a fresh subprocess. Peak memory is the highest
+current RSS sampled during the load, minus the RSS just before it: ru_maxrss
+is inherited across fork/exec on Linux, so it reflects the parent's peak.
+
+    python bench_ingest.py --rows 1000000
+    python bench_ingest.py --rows 1000000 --formats csv parquet arrow ndjson
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_CSV = os.path.join(HERE, "..", "data", "emp_data_updated.csv")
+
+FORMATS = {
+    "csv": ".csv",
+    "excel": ".xlsx",
+    "json": ".json",
+    "ndjson": ".ndjson",
+    "parquet": ".parquet",
+    "arrow": ".arrow",
+}
+
+
+def write_inputs(rows: int, formats, directory: str):
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    sample = pd.read_csv(SAMPLE_CSV)
+    df = sample.sample(n=rows, replace=True, random_state=0).reset_index(drop=True)
+    paths = {}
+    for fmt in formats:
+        path = os.path.join(directory, "employees" + FORMATS[fmt])
+        started = time.perf_counter()
+        if fmt == "csv":
+            df.to_csv(path, index=False)
+        elif fmt == "excel":
+            df.to_excel(path, index=False)
+        elif fmt == "json":
+            df.to_json(path, orient="records")
+        elif fmt == "ndjson":
+            df.to_json(path, orient="records", lines=True)
+        elif fmt == "parquet":
+            df.to_parquet(path, index=False)
+        elif fmt == "arrow":
+            feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), path, compression="uncompressed")
+        print(f"   wrote {fmt:<8} {os.path.getsize(path) / 1e6:8.1f} MB in {time.perf_counter() - started:6.1f}s")
+        paths[fmt] = path
+    return paths
+
+
+def current_rss_kb() -> int:
+    """Resident set size right now (Linux); falls back to the peak elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval: float = 0.002):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_kb = current_rss_kb()
+        self.running = True
+
+    def run(self):
+        while self.running:
+            self.peak_kb = max(self.peak_kb, current_rss_kb())
+            time.sleep(self.interval)
+
+    def stop(self) -> int:
+        self.running = False
+        self.join()
+        return max(self.peak_kb, current_rss_kb())
+
+
+def load_once(path: str):
+    """Subprocess entry point: load one file and print seconds and peak RSS growth"""
+    from employee_ingest import load_employee_frame
+
+    with open(path, "rb") as f:
+        content_bytes = f.read()
+    baseline_kb = current_rss_kb()
+    sampler = RssSampler()
+    sampler.start()
+    started = time.perf_counter()
+    df = load_employee_frame(path, content_bytes)
+    elapsed = time.perf_counter() - started
+    peak_kb = sampler.stop()
+    print(f"{elapsed} {max(peak_kb - baseline_kb, 0)} {len(df)} {len(df.columns)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument("--load", help=argparse.SUPPRESS)
+    parser.add_argument("--write", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.load:
+        load_once(args.load)
+        sys.exit(0)
+    if args.write:
+        write_inputs(args.rows, args.formats, args.write)
+        sys.exit(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        # Generated in its own process so the roster never lives in this one
+        print(f"📦 Writing {args.rows:,} rows per format...")
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--write", directory,
+                        "--rows", str(args.rows), "--formats", *args.formats], cwd=HERE, check=True)
+        paths = {fmt: os.path.join(directory, "employees" + FORMATS[fmt]) for fmt in args.formats}
+
+        print(f"\n{'format':<8} {'load s':>8} {'peak MB':>9} {'rows':>10} {'cols':>5}")
+        for fmt, path in paths.items():
+            out = subprocess.run([sys.executable, os.path.abspath(__file__), "--load", path],
+                                 cwd=HERE, capture_output=True, text=True, check=True)
+            elapsed, peak_kb, n_rows, n_cols = out.stdout.split()[-4:]
+            print(f"{fmt:<8} {float(elapsed):8.2f} {int(peak_kb) / 1024:9.1f} {int(n_rows):>10,} {n_cols:>5}")
@@ -0,0 +1,68 @@
+"""Write-throughput benchmark for the leave ledger.
+
+Simulates many concurrent /apply requests against one node and reports
+applications per second, fsyncs issued and the average group-commit size.
+
+    python bench_ledger.py --threads 64 --applications 20000
+"""
+import argparse
+import tempfile
+import threading
+import time
+
+from leave_ledger import LeaveLedger
+
+
+def run(threads: int, applications: int, employees: int, snapshot_every: int):
+    roster = [
+        {"emp_id": f"E{i:05d}", "name": f"Employee {i}", "leave_balance_pl": 10 ** 9,
+         "total_pl_taken_this_year": 0}
+        for i in range(employees)
+    ]
+    per_thread = applications // threads
+    latencies = []
+    latency_lock = threading.Lock()
+
+    with tempfile.TemporaryDirectory() as directory:
+        ledger = LeaveLedger(directory, snapshot_every=snapshot_every)
+
+        def worker(worker_id: int):
+            local = []
+            for i in range(per_thread):
+                employee = roster[(worker_id * per_thread + i) % employees]
+                started = time.perf_counter()
+                ledger.apply_leave(employee, "pl", 1)
+                local.append(time.perf_counter() - started)
+            with latency_lock:
+                latencies.extend(local)
+
+        pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        elapsed = time.perf_counter() - started
+        stats = ledger.stats()
+        ledger.close()
+
+    latencies.sort()
+    total = per_thread * threads
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"threads={threads:<4} applications={total:<7} "
+          f"throughput={total / elapsed:>9.0f}/s  p50={p50:.2f}ms  p99={p99:.2f}ms  "
+          f"fsyncs={stats['group_commits']}  avg_batch={stats['avg_batch_size']}  "
+          f"snapshots={stats['snapshots']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--applications", type=int, default=20000)
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--snapshot-every", type=int, default=10000)
+    args = parser.parse_args()
+
+    for thread_count in args.threads:
+        run(thread_count, args.applications, args.employees, args.snapshot_every)
@@ -0,0 +1,84 @@
+"""Per-request CPU cost of building the QA model input, before and after prompt caching.
+
+"before" formats the employee record and tokenizes the full question + context
+on every request (the original create_qa_context + pipeline path). "after"
+looks up the precomputed fragment, concatenates cached token IDs and only
+tokenizes the question.
+
+    python bench_prompt_cache.py --requests 2000
+    python bench_prompt_cache.py --no-tokenizer     # formatting cost only
+"""
+import argparse
+import os
+import random
+import time
+
+import pandas as pd
+
+from employee_ingest import load_employee_frame
+from prompt_cache import PromptFragmentCache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "..", "data")
+QUESTION = "When did I last take leave and how much privilege leave have I used this year?"
+
+
+def legacy_context(employee, question, policy):
+    employee_info = []
+    for key, value in employee.items():
+        if value != '' and value is not None and not pd.isna(value):
+            formatted_key = key.replace('_', ' ').title()
+            employee_info.append(f"{formatted_key}: {value}")
+    employee_summary = ". ".join(employee_info)
+    policy_excerpt = policy[:600] if len(policy) > 600 else policy
+    return f"Employee Information: {employee_summary}. Company Policy: {policy_excerpt}", question
+
+
+def cpu_per_request(fn, employees, requests: int) -> float:
+    picks = [random.choice(employees) for _ in range(requests)]
+    started = time.process_time()
+    for employee in picks:
+        fn(employee)
+    return (time.process_time() - started) / requests * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--model", default="distilbert-base-uncased-distilled-squad")
+    parser.add_argument("--no-tokenizer", action="store_true")
+    args = parser.parse_args()
+
+    with open(os.path.join(DATA_DIR, "emp_data_updated.csv"), "rb") as f:
+        df = load_employee_frame("emp_data_updated.csv", f.read())
+    employees = df.fillna('').to_dict(orient="records")
+    with open(os.path.join(HERE, "..", "policy.txt"), encoding="utf-8") as f:
+        policy = f.read()
+
+    tokenizer = None
+    if not args.no_tokenizer:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(args.model)
+
+    cache = PromptFragmentCache(lambda emp: emp, tokenizer=tokenizer)
+    cache.publish(employees)
+    cache.set_policy(policy)
+
+    def before(employee):
+        context, question = legacy_context(employee, QUESTION, policy)
+        if tokenizer is not None:
+            tokenizer(question, context)
+
+    def after(employee):
+        fragment = cache.get(employee)
+        if tokenizer is not None:
+            cache.qa_context(fragment)
+            tokenizer(QUESTION, add_special_tokens=False)
+
+    random.seed(0)
+    before_ms = cpu_per_request(before, employees, args.requests)
+    after_ms = cpu_per_request(after, employees, args.requests)
+    print(f"employees={len(employees)} requests={args.requests} tokenizer={'on' if tokenizer else 'off'}")
+    print(f"before: {before_ms:.3f} ms CPU/request")
+    print(f"after:  {after_ms:.3f} ms CPU/request")
+    print(f"saved:  {before_ms - after_ms:.3f} ms CPU/request ({(1 - after_ms / before_ms) * 100:.0f}%)")
@@ -0,0 +1,127 @@
+import io
+import json
+from typing import Iterable, List
+
+import pandas as pd
+
+CSV_EXTENSIONS = (".csv",)
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+JSON_EXTENSIONS = (".json",)
+NDJSON_EXTENSIONS = (".ndjson", ".jsonl")
+PARQUET_EXTENSIONS = (".parquet", ".pq")
+ARROW_EXTENSIONS = (".arrow", ".feather", ".ipc")
+
+SUPPORTED_EXTENSIONS = (CSV_EXTENSIONS + EXCEL_EXTENSIONS + JSON_EXTENSIONS + NDJSON_EXTENSIONS
+                        + PARQUET_EXTENSIONS + ARROW_EXTENSIONS)
+
+# Handle common column name variations
+COLUMN_MAPPING = {
+    'employee_name': 'name',
+    'emp_name': 'name',
+    'employee_id': 'emp_id',
+    'pl_balance': 'leave_balance_pl',
+    'privilege_leave': 'leave_balance_pl',
+    'casual_leave': 'leave_balance_cl',
+    'cl_balance': 'leave_balance_cl',
+    'sick_leave': 'leave_balance_sl',
+    'sl_balance': 'leave_balance_sl',
+    'taskspending': 'pending_tasks',
+    'tasks_pending': 'pending_tasks'
+}
+
+
+def normalize_column_names(columns: Iterable) -> List[str]:
+    """Standardized names for a list of column names (schema only, no row data touched)"""
+    # Strip whitespace and standardize column names
+    names = [str(col).strip().lower().replace(' ', '_').replace('-', '_') for col in columns]
+
+    for old_col, new_col in COLUMN_MAPPING.items():
+        if old_col in names and new_col not in names:
+            names[names.index(old_col)] = new_col
+
+    return names
+
+
+def clean_dataframe_columns(df):
+    """Clean and standardize dataframe columns"""
+    df.columns = normalize_column_names(df.columns)
+    return df
+
+
+def _decode_text(content_bytes: bytes) -> str:
+    try:
+        return content_bytes.decode("utf-8")
+    except UnicodeDecodeError:
+        try:
+            return content_bytes.decode("ISO-8859-1")
+        except UnicodeDecodeError:
+            return content_bytes.decode("utf-8", errors='ignore')
+
+
+def _read_excel(content_bytes: bytes) -> pd.DataFrame:
+    # The Rust calamine reader is many times faster than openpyxl on large workbooks
+    try:
+        return pd.read_excel(io.BytesIO(content_bytes), engine="calamine")
+    except (ImportError, ValueError):
+        return pd.read_excel(io.BytesIO(content_bytes))
+
+
+def _arrow_to_frame(table) -> pd.DataFrame:
+    """Hand the Arrow buffers to pandas, then normalize column names"""
+    # split_blocks avoids consolidating columns into 2D blocks (an extra copy);
+    # self_destruct frees each Arrow column as soon as it has been converted.
+    # Names are normalized afterwards: the pandas metadata in the file refers
+    # to the original names, e.g. for an "Employee ID" index.
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    if any(name is not None for name in df.index.names):
+        df = df.reset_index()  # a DataFrame index saved in the file is a column of the roster
+    return clean_dataframe_columns(df)
+
+
+def _read_arrow_ipc(content_bytes: bytes):
+    import pyarrow as pa
+
+    buffer = pa.py_buffer(content_bytes)
+    try:
+        return pa.ipc.open_file(buffer).read_all()
+    except pa.ArrowInvalid:
+        return pa.ipc.open_stream(buffer).read_all()
+
+
+def load_employee_frame(filename: str, content_bytes: bytes) -> pd.DataFrame:
+    """Parse an uploaded employee file into a dataframe with standardized column names.
+
+    Raises ValueError for unsupported file types.
+    """
+    filename = filename.lower()
+
+    if filename.endswith(CSV_EXTENSIONS):
+        return clean_dataframe_columns(pd.read_csv(io.StringIO(_decode_text(content_bytes))))
+
+    if filename.endswith(EXCEL_EXTENSIONS):
+        return clean_dataframe_columns(_read_excel(content_bytes))
+
+    if filename.endswith(PARQUET_EXTENSIONS):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        return _arrow_to_frame(pq.read_table(pa.BufferReader(content_bytes)))
+
+    if filename.endswith(ARROW_EXTENSIONS):
+        return _arrow_to_frame(_read_arrow_ipc(content_bytes))
+
+    if filename.endswith(NDJSON_EXTENSIONS):
+        import pyarrow as pa
+        import pyarrow.json as pa_json
+
+        return _arrow_to_frame(pa_json.read_json(pa.BufferReader(content_bytes)))
+
+    if filename.endswith(JSON_EXTENSIONS):
+        records = json.loads(_decode_text(content_bytes))
+        if isinstance(records, dict):
+            # Accept {"employees": [...]} style wrappers around the record list
+            records = next((v for v in records.values() if isinstance(v, list)), [records])
+        return clean_dataframe_columns(pd.DataFrame.from_records(records))
+
+    raise ValueError("Unsupported employee file format. Use CSV, Excel, JSON/NDJSON, Parquet or Arrow.")
+
@@ -0,0 +1,240 @@
+"""Model backends selectable by AppConfig.inference_backend.
+
+torch and transformers are imported inside `load`, so presets without a
+model (or requests served before loading finishes) never pay for them.
+"""
+import warnings
+from typing import Any, Dict, List, Optional
+
+from prompt_cache import EmployeeFragment, PromptFragmentCache, answer_from_token_ids
+from rule_engine import parse_question_date
+
+warnings.filterwarnings("ignore", message=".*clean_up_tokenization_spaces.*")
+
+
+def date_hint(question: str) -> str:
+    """Weekday note for the first date in the question, to help generative models"""
+    date_obj = parse_question_date(question)
+    if date_obj is None:
+        return ""
+    return f"\nNote: {date_obj.strftime('%d-%m-%Y')} is a {date_obj.strftime('%A')}."
+
+
+class InferenceBackend:
+    """No model: every /ask is answered by the rule engine or the employee info block"""
+    name = "none"
+    uses_token_ids = False  # hands its tokenizer to the prompt cache for token-level prompts
+
+    def __init__(self, model_names: Optional[List[str]] = None):
+        self.model_names = model_names or []
+        self.pipeline = None
+        self.loaded = False
+
+    @property
+    def tokenizer(self):
+        return getattr(self.pipeline, "tokenizer", None)
+
+    def load(self) -> bool:
+        return False
+
+    def answer(self, question: str, fragment: EmployeeFragment, cache: PromptFragmentCache,
+               deadline: Optional[float] = None) -> str:
+        """Answer from the model. `deadline` (time.time()) lets out-of-process backends drop late work"""
+        raise RuntimeError("No inference backend configured")
+
+
+class ExtractiveQABackend(InferenceBackend):
+    """Extractive question answering (DistilBERT/RoBERTa SQuAD models) on CPU"""
+    name = "extractive_qa"
+    uses_token_ids = True
+    default_models = [
+        "distilbert-base-uncased-distilled-squad",
+        "distilbert-base-cased-distilled-squad",
+        "deepset/roberta-base-squad2",
+        "deepset/minilm-uncased-squad2",
+        "bert-large-uncased-whole-word-masking-finetuned-squad"
+    ]
+
+    def load(self) -> bool:
+        from transformers import pipeline
+
+        for model_name in self.model_names or self.default_models:
+            try:
+                print(f"🔄 Trying to load QA model: {model_name}...")
+
+                try:
+                    # First try: Normal loading
+                    self.pipeline = pipeline(
+                        "question-answering",
+                        model=model_name,
+                        device=-1,
+                        trust_remote_code=True
+                    )
+                    print(f"✅ Successfully loaded {model_name}")
+                    self.loaded = True
+                    return True
+
+                except Exception as network_error:
+                    if any(keyword in str(network_error).lower() for keyword in ['connection', 'network', 'timeout', 'resolve']):
+                        print(f"🌐 Network issue with {model_name}: {str(network_error)[:100]}...")
+
+                        # Try with different timeout settings
+                        try:
+                            import requests
+                            requests.adapters.DEFAULT_TIMEOUT = 60
+
+                            self.pipeline = pipeline(
+                                "question-answering",
+                                model=model_name,
+                                device=-1,
+                                trust_remote_code=True,
+                                use_fast=False
+                            )
+                            print(f"✅ Successfully loaded {model_name} with extended timeout")
+                            self.loaded = True
+                            return True
+                        except:
+                            print(f"❌ Still failed with extended timeout for {model_name}")
+                            continue
+                    else:
+                        print(f"❌ Non-network error with {model_name}: {network_error}")
+                        continue
+
+            except Exception as e:
+                print(f"❌ Failed to load {model_name}: {e}")
+                continue
+
+        print("❌ All QA models failed to load due to network issues.")
+        print("🔧 Suggestions to fix:")
+        print("   1. Check your internet connection")
+        print("   2. Try using a VPN if HuggingFace is blocked")
+        print("   3. Consider downloading models manually for offline use")
+        print("💡 System will use advanced rule-based responses instead!")
+        return False
+
+    def answer(self, question: str, fragment: EmployeeFragment, cache: PromptFragmentCache,
+               deadline: Optional[float] = None) -> str:
+        qa_context = cache.qa_context(fragment)
+        if qa_context is not None:
+            result = answer_from_token_ids(self.pipeline, question, qa_context)
+        else:
+            context = f"Employee Information: {fragment.summary}. Company Policy: {cache.policy_excerpt}"
+            result = self.pipeline(question=question, context=context)
+        return result.get('answer', '')
+
+
+class Text2TextBackend(InferenceBackend):
+    """Instruction-following seq2seq model (flan-t5) with worked examples in the prompt"""
+    name = "text2text"
+    default_models = ["google/flan-t5-small"]
+
+    instruction_block = """
+Rules:
+- PL (Privilege Leave) can only be applied if 'leave_balance_pl' > 0
+- LTA requires 3 or more continuous PL days
+- PL cannot be taken on weekends or holidays
+- If LOP > 1 month, PL accrual is paused
+- If unsure, say: "Please consult HR for more details."
+"""
+
+    example_block = """
+Examples:
+Q: How many PL do I have left?
+A: You have 20 Privilege Leave days remaining. You can apply as long as there are no LOP blocks and it's not a holiday/weekend.
+
+Q: Can I take leave on 25-12-2025?
+A: 25-12-2025 is a holiday, so Privilege Leave cannot be applied for that date.
+"""
+
+    def load(self) -> bool:
+        from transformers import pipeline
+
+        model_name = (self.model_names or self.default_models)[0]
+        try:
+            self.pipeline = pipeline("text2text-generation", model=model_name)
+            print(f"✅ Successfully loaded {model_name}")
+            self.loaded = True
+        except Exception as e:
+            print(f"❌ Failed to load {model_name}: {e}")
+        return self.loaded
+
+    def answer(self, question: str, fragment: EmployeeFragment, cache: PromptFragmentCache,
+               deadline: Optional[float] = None) -> str:
+        prompt = f"""
+You are a helpful HR assistant. Answer clearly and logically based on the records and policies.
+
+Employee Record:
+{fragment.info_block}
+
+Company Leave Policy:
+{cache.policy_text}
+
+{self.instruction_block}
+{self.example_block}
+{date_hint(question)}
+
+Question:
+{question}
+
+Answer:
+""".strip()
+        response = self.pipeline(prompt, max_length=200, do_sample=False)
+        return response[0]["generated_text"]
+
+
+class CausalLMBackend(InferenceBackend):
+    """Instruction-tuned causal LM (Gemma) in fp16 on GPU"""
+    name = "causal_lm"
+    default_models = ["google/gemma-1.1-7b-it"]
+
+    def load(self) -> bool:
+        import torch
+        from transformers import pipeline, AutoTokenizer, AutoModelForCausalLM
+
+        model_id = (self.model_names or self.default_models)[0]
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(model_id)
+            model = AutoModelForCausalLM.from_pretrained(
+                model_id,
+                device_map="auto",
+                torch_dtype=torch.float16
+            )
+            self.pipeline = pipeline("text-generation", model=model, tokenizer=tokenizer, max_new_tokens=300)
+            print(f"✅ Successfully loaded {model_id}")
+            self.loaded = True
+        except Exception as e:
+            print(f"❌ Failed to load {model_id}: {e}")
+        return self.loaded
+
+    def answer(self, question: str, fragment: EmployeeFragment, cache: PromptFragmentCache,
+               deadline: Optional[float] = None) -> str:
+        full_prompt = f"""
+You are an HR assistant.
+
+Employee Record:
+{fragment.info_block}
+
+Company Policy:
+{cache.policy_text}
+
+Rules:
+- PL (Privilege Leave) requires positive balance.
+- LTA needs 3+ continuous PL days.
+- PL not valid on holidays/weekends.
+- Long LOP blocks pause PL accrual.
+- If unsure, say: "Please consult HR for more details."
+{date_hint(question)}
+
+Question:
+{question}
+
+Answer:
+""".strip()
+        result = self.pipeline(full_prompt)
+        return result[0]["generated_text"].replace(full_prompt, "").strip()
+
+
+BACKENDS: Dict[str, Any] = {
+    backend.name: backend
+    for backend in (InferenceBackend, ExtractiveQABackend, Text2TextBackend, CausalLMBackend)
+}
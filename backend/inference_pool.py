@@ -0,0 +1,296 @@
+"""Model replicas in separate processes, each pinned to its own CPU cores.
+
+Short extractive-QA inputs do not scale well across many intra-op threads in
+one process; several single- or few-threaded replicas on disjoint cores
+usually give more throughput. The parent routes each request to the replica
+with the fewest requests in flight and restarts replicas that die.
+"""
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Dict, List, Optional
+
+from inference_backends import InferenceBackend
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_cpu_sets(replicas: int, threads: int, cpus: Optional[List[int]] = None) -> List[List[int]]:
+    """Give each replica `threads` distinct cores, wrapping around when cores run out"""
+    cpus = cpus or available_cpus()
+    cycle = itertools.cycle(cpus)
+    return [sorted({next(cycle) for _ in range(min(threads, len(cpus)))}) for _ in range(replicas)]
+
+
+def _replica_main(index: int, backend_cls, model_names: List[str], threads: int, cpus: List[int],
+                  requests: mp.Queue, responses: mp.Queue):
+    """Replica process: pin, limit threads, load the model, then serve requests until None"""
+    # Thread pools read these at import time, so set them before torch loads
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except ImportError:
+        pass
+
+    backend = backend_cls(model_names)
+    loaded = backend.load()
+    model_name = getattr(getattr(backend.pipeline, "model", None), "name_or_path", None)
+    responses.put(("ready", loaded, model_name))
+    if not loaded:
+        return
+
+    while True:
+        job = requests.get()
+        if job is None:
+            return
+        job_id, deadline, args = job
+        if time.time() >= deadline:
+            responses.put((job_id, False, "expired before the replica started it"))
+            continue
+        try:
+            responses.put((job_id, True, backend.answer(*args)))
+        except Exception as e:
+            responses.put((job_id, False, f"{type(e).__name__}: {e}"))
+
+
+class _Replica:
+    def __init__(self, index: int, cpus: List[int]):
+        self.index = index
+        self.cpus = cpus
+        self.process = None
+        self.requests = None
+        self.responses = None
+        self.inflight: Dict[int, Future] = {}
+        self.deadlines: Dict[int, float] = {}
+        self.ready = threading.Event()
+        self.loaded = False
+        self.model_name = None
+        self.restart_delay = 0.0
+        self.restart_at = 0.0
+
+
+class InferencePool:
+    """N model replica processes with least-loaded routing and crash restarts.
+
+    A replica still holding a request `hang_grace` seconds past its deadline
+    is treated as hung: it is killed and restarted like a crashed one.
+    Replicas that keep dying are restarted with exponential backoff, up to
+    `max_restart_delay` apart; one whose model failed to load is left down.
+    """
+
+    def __init__(self, backend_cls, model_names: Optional[List[str]] = None, replicas: int = 2,
+                 threads_per_replica: int = 1, cpu_sets: Optional[List[List[int]]] = None,
+                 monitor_interval: float = 0.5, hang_grace: float = 30.0, max_restart_delay: float = 60.0):
+        self.backend_cls = backend_cls
+        self.model_names = model_names or []
+        self.threads_per_replica = threads_per_replica
+        self.monitor_interval = monitor_interval
+        self.hang_grace = hang_grace
+        self.max_restart_delay = max_restart_delay
+        cpu_sets = cpu_sets or plan_cpu_sets(replicas, threads_per_replica)
+        self._ctx = mp.get_context("spawn")  # no fork: torch thread pools do not survive it
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count()
+        self._replicas = [_Replica(i, cpu_sets[i % len(cpu_sets)]) for i in range(replicas)]
+        self._closed = False
+        self.restarts = 0
+        self.completed = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def _spawn(self, replica: _Replica):
+        requests, responses = self._ctx.Queue(), self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_replica_main,
+            args=(replica.index, self.backend_cls, self.model_names, self.threads_per_replica,
+                  replica.cpus, requests, responses),
+            name=f"model-replica-{replica.index}",
+            daemon=True,
+        )
+        process.start()
+        with self._lock:
+            replica.ready.clear()
+            replica.requests, replica.responses, replica.process = requests, responses, process
+        threading.Thread(target=self._collect, args=(replica, responses), daemon=True,
+                         name=f"model-replica-{replica.index}-responses").start()
+
+    def start(self, timeout: Optional[float] = None) -> bool:
+        """Start every replica and wait for the models to load; True if at least one loaded"""
+        for replica in self._replicas:
+            self._spawn(replica)
+        threading.Thread(target=self._monitor, name="model-replica-monitor", daemon=True).start()
+        waiting_since = time.time()
+        for replica in self._replicas:
+            # A replica that dies while loading never reports ready
+            while not replica.ready.wait(self.monitor_interval) and replica.process.is_alive():
+                if timeout is not None and time.time() - waiting_since > timeout:
+                    break
+        loaded = [r for r in self._replicas if r.loaded]
+        print(f"🧮 Inference pool: {len(loaded)}/{len(self._replicas)} replicas ready, "
+              f"{self.threads_per_replica} thread(s) each, cores {[r.cpus for r in self._replicas]}")
+        return bool(loaded)
+
+    def close(self):
+        self._closed = True
+        for replica in self._replicas:
+            if replica.process is not None and replica.process.is_alive():
+                replica.requests.put(None)
+                replica.process.join(timeout=5)
+                if replica.process.is_alive():
+                    replica.process.terminate()
+
+    def _fail_inflight(self, replica: _Replica, reason: str):
+        with self._lock:
+            inflight, replica.inflight, replica.deadlines = replica.inflight, {}, {}
+            self.failed += len(inflight)
+        for future in inflight.values():
+            if not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    def _monitor(self):
+        """Restart replicas whose process died or hung, failing the requests they held"""
+        while not self._closed:
+            time.sleep(self.monitor_interval)
+            for replica in self._replicas:
+                if self._closed or self._load_failed(replica):
+                    continue
+                if replica.process.is_alive():
+                    with self._lock:
+                        oldest = min(replica.deadlines.values(), default=None)
+                    if oldest is None or time.time() < oldest + self.hang_grace:
+                        continue
+                    print(f"⏳ Model replica {replica.index} is {self.hang_grace:g}s past a request deadline, killing it")
+                    replica.process.kill()
+                    replica.process.join()
+                elif time.time() < replica.restart_at:
+                    continue  # backing off after repeated crashes
+                print(f"💥 Model replica {replica.index} exited (code {replica.process.exitcode}), restarting")
+                replica.loaded = False
+                self._fail_inflight(replica, f"model replica {replica.index} crashed")
+                self.restarts += 1
+                # Doubles until the replica loads its model again (reset in _collect)
+                replica.restart_delay = min(max(replica.restart_delay * 2, self.monitor_interval), self.max_restart_delay)
+                replica.restart_at = time.time() + replica.restart_delay
+                self._spawn(replica)
+
+    @staticmethod
+    def _load_failed(replica: _Replica) -> bool:
+        """The model could not load: the replica reported ("ready", False) and exited cleanly"""
+        if replica.loaded:
+            return False
+        return replica.ready.is_set() or replica.process.exitcode == 0
+
+    # ------------------------------------------------------------------
+    # Requests
+    # ------------------------------------------------------------------
+    def _collect(self, replica: _Replica, responses: mp.Queue):
+        while not self._closed:
+            try:
+                message = responses.get(timeout=self.monitor_interval)
+            except queue.Empty:
+                if replica.responses is not responses:
+                    return  # replica was restarted with fresh queues
+                continue
+            except (EOFError, OSError):
+                return
+            if message[0] == "ready":
+                _, replica.loaded, replica.model_name = message
+                if replica.loaded:
+                    replica.restart_delay = 0.0
+                replica.ready.set()
+                continue
+            job_id, ok, result = message
+            with self._lock:
+                future = replica.inflight.pop(job_id, None)
+                replica.deadlines.pop(job_id, None)
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            if future is None or future.done():
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    def submit(self, *args, deadline: Optional[float] = None) -> Future:
+        """Queue backend.answer(*args) on the least-loaded ready replica"""
+        future: Future = Future()
+        deadline = deadline if deadline is not None else time.time() + 3600
+        with self._lock:
+            candidates = [r for r in self._replicas if r.loaded and r.process.is_alive()]
+            if not candidates:
+                raise RuntimeError("No model replica is available")
+            replica = min(candidates, key=lambda r: len(r.inflight))
+            job_id = next(self._job_ids)
+            replica.inflight[job_id] = future
+            replica.deadlines[job_id] = deadline
+            # Under the lock, so a restart cannot swap the queue after the job was
+            # registered: either the job goes to this process or the restart fails it
+            replica.requests.put((job_id, deadline, args))
+        return future
+
+    @property
+    def model_name(self) -> Optional[str]:
+        return next((r.model_name for r in self._replicas if r.loaded), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "replicas": [
+                    {"index": r.index, "cpus": r.cpus, "loaded": r.loaded, "inflight": len(r.inflight),
+                     "alive": r.process is not None and r.process.is_alive()}
+                    for r in self._replicas
+                ],
+                "threads_per_replica": self.threads_per_replica,
+                "completed": self.completed,
+                "failed": self.failed,
+                "restarts": self.restarts,
+            }
+
+
+class PooledBackend(InferenceBackend):
+    """Runs another backend's model in an InferencePool; prompts are still built in this process"""
+
+    def __init__(self, backend_cls, model_names: Optional[List[str]] = None, replicas: int = 2,
+                 threads_per_replica: int = 1, cpu_sets: Optional[List[List[int]]] = None):
+        super().__init__(model_names)
+        self.name = f"{backend_cls.name} x{replicas}"
+        self.uses_token_ids = backend_cls.uses_token_ids
+        self.pool = InferencePool(backend_cls, model_names, replicas, threads_per_replica, cpu_sets)
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    def load(self) -> bool:
+        self.loaded = self.pool.start()
+        if self.loaded and self.uses_token_ids:
+            # Only the tokenizer lives in the server process, for the prompt cache
+            from transformers import AutoTokenizer
+            self._tokenizer = AutoTokenizer.from_pretrained(self.pool.model_name)
+        return self.loaded
+
+    def answer(self, question, fragment, cache, deadline: Optional[float] = None) -> str:
+        future = self.pool.submit(question, fragment, cache.snapshot(fragment), deadline=deadline)
+        try:
+            return future.result(timeout=None if deadline is None else max(deadline - time.time(), 0))
+        except TimeoutError:
+            raise TimeoutError("Model replica did not answer before the request deadline")
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class LoadShed(Exception):
+    """Raised when a request should get a deterministic answer instead of waiting for the model"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class _Job:
+    __slots__ = ("deadline", "abandoned")
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.abandoned = False
+
+
+class InferenceQueue:
+    """Bounded model queue with per-request deadlines and admission control.
+
+    A request is admitted only if the queue has room and the expected wait
+    (queued jobs x moving average of service time) fits its latency budget.
+    An idle queue always admits one request as a probe, so a single slow call
+    cannot keep the average above the budget and shed everything after it.
+    Admitted requests that miss their deadline, or whose client goes away,
+    are cancelled: jobs that have not started are dropped from the queue,
+    and jobs that start after their deadline are skipped by the worker.
+    """
+
+    def __init__(self, workers: int = 1, max_depth: int = 8, poll_interval: float = 0.05):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._service_time: Optional[float] = None  # EWMA, seconds
+        self._counters = {
+            "admitted": 0,
+            "completed": 0,
+            "errors": 0,
+            "shed_queue_full": 0,
+            "shed_over_budget": 0,
+            "timed_out": 0,
+            "abandoned": 0,
+            "skipped_expired": 0,
+        }
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def estimated_wait(self) -> float:
+        """Expected seconds until a newly admitted job finishes"""
+        if self._service_time is None:
+            return 0.0
+        return (self._depth // self.workers + 1) * self._service_time
+
+    def _release(self, _future):
+        with self._lock:
+            self._depth -= 1
+
+    def _execute(self, job: _Job, fn: Callable, args, kwargs):
+        if job.abandoned or time.monotonic() >= job.deadline:
+            self._count("skipped_expired")
+            raise CancelledError()
+        started = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._service_time = elapsed if self._service_time is None else 0.8 * self._service_time + 0.2 * elapsed
+
+    async def run(self, fn: Callable, *args, budget: float,
+                  abandoned: Optional[Callable[[], Awaitable[bool]]] = None, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the model worker within `budget` seconds or raise LoadShed"""
+        deadline = time.monotonic() + budget
+        with self._lock:
+            if self._depth >= self.max_depth:
+                self._counters["shed_queue_full"] += 1
+                raise LoadShed("queue_full")
+            if self._depth > 0 and self.estimated_wait() > budget:
+                self._counters["shed_over_budget"] += 1
+                raise LoadShed("over_budget")
+            self._depth += 1
+            self._counters["admitted"] += 1
+
+        job = _Job(deadline)
+        future = self._executor.submit(self._execute, job, fn, args, kwargs)
+        future.add_done_callback(self._release)
+        waiter = asyncio.wrap_future(future)
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                reason = "timed_out"
+                break
+            done, _ = await asyncio.wait({waiter}, timeout=min(remaining, self.poll_interval))
+            if done:
+                try:
+                    result = waiter.result()
+                except (CancelledError, asyncio.CancelledError):
+                    raise LoadShed("timed_out")
+                except Exception:
+                    self._count("errors")
+                    raise
+                self._count("completed")
+                return result
+            if abandoned is not None and await abandoned():
+                reason = "abandoned"
+                break
+
+        # Give up: drop the job if it is still queued, or let the worker skip it
+        job.abandoned = True
+        waiter.cancel()
+        self._count(reason)
+        raise LoadShed(reason)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._depth,
+                "max_depth": self.max_depth,
+                "workers": self.workers,
+                "avg_service_ms": round(self._service_time * 1000, 1) if self._service_time is not None else None,
+                **self._counters,
+            }
@@ -0,0 +1,119 @@
+import threading
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from leave_ledger import as_number
+
+# Dimensions HR can group by (cleaned column names)
+GROUP_DIMENSIONS = ["department", "business_unit", "country", "city"]
+
+# Metric -> source column; lop_employees/on_lop_now are head counts
+SUM_METRICS = {
+    "pl_taken": "total_pl_taken_this_year",
+    "sl_cl_taken": "total_sl_cl_taken_this_year",
+    "lop_taken": "lop_taken",
+}
+METRICS = ["headcount", *SUM_METRICS, "lop_employees", "on_lop_now"]
+
+TRUTHY = {"yes", "y", "true", "1"}
+
+
+def _group_label(value) -> str:
+    if value is None or value == '' or (isinstance(value, float) and value != value):
+        return "Unknown"
+    return str(value).strip() or "Unknown"
+
+
+def row_metrics(employee: Dict[str, Any], deltas: Dict[str, float]) -> Dict[str, float]:
+    """Metric contribution of one employee row, with ledger deltas applied"""
+    metrics = {"headcount": 1.0}
+    for metric, col in SUM_METRICS.items():
+        metrics[metric] = as_number(employee.get(col)) + deltas.get(col, 0.0)
+    metrics["lop_employees"] = 1.0 if metrics["lop_taken"] > 0 else 0.0
+    metrics["on_lop_now"] = 1.0 if str(employee.get("is_on_lop_now", "")).strip().lower() in TRUTHY else 0.0
+    return metrics
+
+
+class LeaveAnalytics:
+    """Per-dimension leave aggregates, built once per dataset version.
+
+    `build` computes every group with one vectorized groupby per dimension.
+    After that, row-level changes (ledger applications) are folded in as
+    metric differences for the affected groups, so queries only read
+    precomputed numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = 0
+        self._dimensions: List[str] = []
+        self._groups: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self._totals: Dict[str, float] = {metric: 0.0 for metric in METRICS}
+
+    def build(self, df: pd.DataFrame) -> int:
+        """Recompute all aggregates from a freshly uploaded dataset and bump the version"""
+        frame = pd.DataFrame(index=df.index)
+        frame["headcount"] = 1.0
+        for metric, col in SUM_METRICS.items():
+            if col in df.columns:
+                frame[metric] = pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype(float)
+            else:
+                frame[metric] = 0.0
+        frame["lop_employees"] = (frame["lop_taken"] > 0).astype(float)
+        if "is_on_lop_now" in df.columns:
+            flags = df["is_on_lop_now"].astype(str).str.strip().str.lower().isin(TRUTHY)
+            frame["on_lop_now"] = flags.astype(float)
+        else:
+            frame["on_lop_now"] = 0.0
+        frame = frame[METRICS]
+
+        dimensions = [dim for dim in GROUP_DIMENSIONS if dim in df.columns]
+        groups = {}
+        for dim in dimensions:
+            labels = df[dim].map(_group_label)
+            grouped = frame.groupby(labels, sort=True).sum()
+            groups[dim] = {label: {metric: float(v) for metric, v in row.items()}
+                           for label, row in zip(grouped.index, grouped.to_dict(orient="records"))}
+        totals = {metric: float(v) for metric, v in frame.sum().items()}
+
+        with self._lock:
+            self._dimensions = dimensions
+            self._groups = groups
+            self._totals = totals
+            self.version += 1
+            return self.version
+
+    def update_row(self, employee: Dict[str, Any], deltas_before: Dict[str, float], deltas_after: Dict[str, float]):
+        """Fold a row-level change into the affected groups (ledger listener)"""
+        before = row_metrics(employee, deltas_before)
+        after = row_metrics(employee, deltas_after)
+        diff = {metric: after[metric] - before[metric] for metric in METRICS if after[metric] != before[metric]}
+        if not diff:
+            return
+        with self._lock:
+            for metric, change in diff.items():
+                self._totals[metric] += change
+            for dim in self._dimensions:
+                group = self._groups[dim].setdefault(_group_label(employee.get(dim)),
+                                                     {metric: 0.0 for metric in METRICS})
+                for metric, change in diff.items():
+                    group[metric] += change
+
+    def query(self, group_by: Optional[str] = None, group: Optional[str] = None) -> Dict[str, Any]:
+        """Read precomputed aggregates: org totals, one dimension, or a single group"""
+        with self._lock:
+            result = {"dataset_version": self.version, "dimensions": list(self._dimensions),
+                      "totals": dict(self._totals)}
+            if group_by is None:
+                return result
+            if group_by not in self._groups:
+                raise ValueError(f"Cannot group by '{group_by}'. Available: {', '.join(self._dimensions) or 'none'}.")
+            result["group_by"] = group_by
+            if group is not None:
+                if group not in self._groups[group_by]:
+                    raise KeyError(f"No {group_by.replace('_', ' ')} named '{group}'.")
+                result["groups"] = {group: dict(self._groups[group_by][group])}
+            else:
+                result["groups"] = {label: dict(metrics) for label, metrics in self._groups[group_by].items()}
+            return result
@@ -0,0 +1,461 @@
+import json
+import math
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Callable
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, single-process use only
+    fcntl = None
+
+# Leave type -> (balance column candidates, "taken this year" column)
+LEAVE_TYPE_COLUMNS = {
+    "pl": (["leave_balance_pl"], "total_pl_taken_this_year"),
+    "cl": (["leave_balance_cl", "leave_balance_sl_cl"], "total_sl_cl_taken_this_year"),
+    "sl": (["leave_balance_sl", "leave_balance_sl_cl"], "total_sl_cl_taken_this_year"),
+    "lop": ([], "lop_taken"),
+}
+
+LEAVE_TYPE_ALIASES = {
+    "privilege": "pl",
+    "casual": "cl",
+    "sick": "sl",
+    "loss of pay": "lop",
+}
+
+LEDGER_FILE = "ledger.log"
+SNAPSHOT_FILE = "snapshot.json"
+LOCK_FILE = "ledger.lock"
+
+
+def as_number(value) -> float:
+    """Convert a stored cell to a number, treating blanks, NaN/NA and text as zero"""
+    try:
+        number = float(value)  # None and pd.NA raise TypeError, '' raises ValueError
+    except (ValueError, TypeError):
+        return 0.0
+    return 0.0 if number != number else number
+
+
+def employee_key(employee: Dict[str, Any]) -> str:
+    """Stable ledger key for an employee: the ID when present, else the name"""
+    emp_id = employee.get("emp_id")
+    if emp_id is not None and str(emp_id).strip() not in ("", "nan"):
+        return str(emp_id).strip()
+    return str(employee.get("name", "")).lower().strip()
+
+
+def normalize_leave_type(leave_type: str) -> str:
+    """Map user-facing leave type names onto ledger codes"""
+    value = (leave_type or "").lower().strip()
+    value = LEAVE_TYPE_ALIASES.get(value, value)
+    if value not in LEAVE_TYPE_COLUMNS:
+        raise ValueError(f"Unknown leave type '{leave_type}'. Use one of: {', '.join(LEAVE_TYPE_COLUMNS)}.")
+    return value
+
+
+def balance_column(employee: Dict[str, Any], leave_type: str) -> Optional[str]:
+    """The column holding this employee's balance for leave_type (None for LOP)"""
+    balance_candidates = LEAVE_TYPE_COLUMNS[leave_type][0]
+    if not balance_candidates:
+        return None
+    return next((col for col in balance_candidates if col in employee), balance_candidates[0])
+
+
+def leave_deltas(employee: Dict[str, Any], leave_type: str, days: float) -> Dict[str, float]:
+    """Column changes caused by taking `days` of `leave_type`, based on the employee's columns"""
+    balance_col = balance_column(employee, leave_type)
+    taken_col = LEAVE_TYPE_COLUMNS[leave_type][1]
+    deltas = {}
+    if balance_col:
+        deltas[balance_col] = -days
+    if taken_col in employee or not balance_col:
+        deltas[taken_col] = days
+    return deltas
+
+
+class _PendingWrite:
+    __slots__ = ("txn", "undo", "done", "error")
+
+    def __init__(self, txn: Dict[str, Any], undo: Callable[[], None]):
+        self.txn = txn
+        self.undo = undo  # reverts the optimistic in-memory update if the write fails
+        self.done = False
+        self.error = None
+
+
+class LeaveLedger:
+    """Append-only leave transaction log with group commit and snapshot compaction.
+
+    Applications are validated and applied to the in-memory balance deltas
+    immediately, then queued for the writer thread. The writer drains every
+    queued transaction into one write + fsync, so concurrent applications
+    share the cost of a single disk flush. Callers return once their batch
+    is durable. With directory=None the ledger is memory-only.
+
+    Deltas are kept per employee key across uploads, so a re-uploaded or
+    extended roster keeps every recorded application. When HR uploads an
+    export that already includes ledger transactions up to some sequence
+    number, rebase(seq) records that, and only later transactions stay
+    applied on top of it.
+    """
+
+    def __init__(self, directory: Optional[str], snapshot_every: int = 10000):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+
+        self._cond = threading.Condition()
+        self._pending: List[_PendingWrite] = []
+        self._closed = False
+
+        # employee -> column -> change. Live deltas include queued transactions;
+        # durable deltas only fsynced ones
+        self._deltas: Dict[str, Dict[str, float]] = {}
+        self._durable_deltas: Dict[str, Dict[str, float]] = {}
+        # Transactions after the latest snapshot (seq > _log_base), kept for rebase
+        self._log_txns: List[Dict[str, Any]] = []
+        self._log_base = 0
+        self._seq = 0
+        self._durable_seq = 0
+        self._since_snapshot = 0
+        self._committed = 0
+        self._batches = 0
+        self._snapshots = 0
+        self._listeners: List[Callable[[Dict[str, Any], Dict[str, float], Dict[str, float]], None]] = []
+
+        self._fd = None
+        self._lock_fd = None
+        self._broken: Optional[OSError] = None
+        self._writer = None
+        if directory is None:
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_directory()
+        self._log_path = os.path.join(directory, LEDGER_FILE)
+        self._snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self._recover()
+        self._fd = os.open(self._log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._writer = threading.Thread(target=self._writer_loop, name="leave-ledger-writer", daemon=True)
+        self._writer.start()
+
+    # ------------------------------------------------------------------
+    # Recovery and compaction
+    # ------------------------------------------------------------------
+    def _lock_directory(self):
+        """Fail fast if another process already writes to this ledger directory"""
+        if fcntl is None:
+            return
+        lock_fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock_fd)
+            raise RuntimeError(
+                f"Leave ledger in {self.directory} is already open in another process; "
+                "run a single server process per ledger directory."
+            )
+        self._lock_fd = lock_fd
+
+    def _recover(self):
+        """Load the latest snapshot and replay the log written after it"""
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._durable_seq = self._log_base = snapshot.get("seq", 0)
+            self._durable_deltas = snapshot.get("deltas", {})
+
+        replayed = 0
+        if os.path.exists(self._log_path):
+            good_offset = 0
+            with open(self._log_path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn write from a crash mid-append
+                    try:
+                        txn = json.loads(line)
+                    except ValueError:
+                        break
+                    good_offset += len(line)
+                    if txn["seq"] <= self._durable_seq:
+                        continue  # already folded into the snapshot
+                    self._log_txns.append(txn)
+                    self._apply_durable(txn)
+                    self._durable_seq = txn["seq"]
+                    replayed += 1
+            if good_offset != os.path.getsize(self._log_path):
+                with open(self._log_path, "r+b") as f:
+                    f.truncate(good_offset)
+
+        self._deltas = {key: dict(cols) for key, cols in self._durable_deltas.items()}
+        self._seq = self._durable_seq
+        self._since_snapshot = replayed
+        if self._seq:
+            print(f"📒 Leave ledger recovered up to transaction {self._seq} ({replayed} replayed from log)")
+
+    def _compact(self):
+        """Write durable deltas to a snapshot and start a fresh log. Writer thread only."""
+        with self._cond:
+            snapshot = {"seq": self._durable_seq, "deltas": self._durable_deltas}
+            payload = json.dumps(snapshot)
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        # Entries up to snapshot["seq"] are now redundant; a crash before the
+        # truncate is harmless because replay skips them by sequence number.
+        os.ftruncate(self._fd, 0)
+        os.fsync(self._fd)
+        with self._cond:
+            self._log_txns = [txn for txn in self._log_txns if txn["seq"] > snapshot["seq"]]
+            self._log_base = snapshot["seq"]
+        self._since_snapshot = 0
+        self._snapshots += 1
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _apply(deltas: Dict[str, Dict[str, float]], txn: Dict[str, Any], sign: float = 1.0):
+        employee_deltas = deltas.setdefault(txn["employee"], {})
+        for col, change in txn["deltas"].items():
+            employee_deltas[col] = employee_deltas.get(col, 0.0) + sign * change
+
+    def _replay_after(self, covered_seq: int, before_seq: int) -> Dict[str, Dict[str, float]]:
+        """Deltas of the applications with covered_seq < seq < before_seq"""
+        deltas: Dict[str, Dict[str, float]] = {}
+        for txn in self._log_txns:
+            if covered_seq < txn["seq"] < before_seq and "rebase" not in txn:
+                self._apply(deltas, txn)
+        return deltas
+
+    def _apply_durable(self, txn: Dict[str, Any]):
+        if "rebase" in txn:
+            self._durable_deltas = self._replay_after(txn["rebase"], txn["seq"])
+        else:
+            self._apply(self._durable_deltas, txn)
+
+    def _rebuild_live(self):
+        """Recompute live deltas from durable state plus the transactions still queued"""
+        deltas = {key: dict(cols) for key, cols in self._durable_deltas.items()}
+        for txn in self._log_txns:
+            if txn["seq"] <= self._durable_seq:
+                continue
+            if "rebase" in txn:
+                deltas = self._replay_after(txn["rebase"], txn["seq"])
+            else:
+                self._apply(deltas, txn)
+        self._deltas = deltas
+
+    def with_recorded(self, fn: Callable[[Dict[str, Dict[str, float]]], Any]) -> Any:
+        """Call fn({employee key: deltas}) with no live change in between"""
+        with self._cond:
+            return fn({key: dict(cols) for key, cols in self._deltas.items()})
+
+    def add_listener(self, listener: Callable[[Dict[str, Any], Dict[str, float], Dict[str, float]], None]):
+        """Register listener(employee, deltas_before, deltas_after), called in sequence order on every live change"""
+        self._listeners.append(listener)
+
+    def _apply_live(self, employee: Dict[str, Any], txn: Dict[str, Any], sign: float = 1.0):
+        """Update live deltas and notify listeners. Caller holds the lock."""
+        before = dict(self._deltas.get(txn["employee"], {}))
+        self._apply(self._deltas, txn, sign)
+        after = dict(self._deltas[txn["employee"]])
+        for listener in self._listeners:
+            try:
+                listener(employee, before, after)
+            except Exception as e:
+                print(f"❌ Leave ledger listener error: {e}")
+
+    def apply_leave(self, employee: Dict[str, Any], leave_type: str, days: float,
+                    leave_date: Optional[str] = None) -> Dict[str, Any]:
+        """Record a leave application and block until it is durable on disk"""
+        leave_type = normalize_leave_type(leave_type)
+        if not math.isfinite(days) or days <= 0:
+            raise ValueError("Number of leave days must be a positive number.")
+
+        key = employee_key(employee)
+        deltas = leave_deltas(employee, leave_type, days)
+
+        with self._cond:
+            self._check_writable()
+            current = self._deltas.get(key, {})
+            for col, change in deltas.items():
+                if change < 0:
+                    available = as_number(employee.get(col)) + current.get(col, 0.0)
+                    if available < -change:
+                        raise ValueError(
+                            f"Insufficient {leave_type.upper()} balance: {available} days available, {days} requested."
+                        )
+            self._seq += 1
+            txn = {
+                "seq": self._seq,
+                "ts": time.time(),
+                "employee": key,
+                "leave_type": leave_type,
+                "days": days,
+                "date": leave_date,
+                "deltas": deltas,
+            }
+            self._apply_live(employee, txn)
+            return self._commit(txn, lambda: self._apply_live(employee, txn, sign=-1.0))
+
+    def rebase(self, covered_seq: int) -> Dict[str, Any]:
+        """Record that the roster being uploaded already includes transactions up to covered_seq.
+
+        Only applications after covered_seq stay applied on top of it. Listeners
+        are not notified; callers rebuild derived state from the new roster.
+        """
+        with self._cond:
+            self._check_writable()
+            if not self._log_base <= covered_seq <= self._seq:
+                raise ValueError(
+                    f"Ledger sequence {covered_seq} is out of range: use a number from "
+                    f"{self._log_base} (last compaction) to {self._seq} (latest transaction)."
+                )
+            self._seq += 1
+            txn = {"seq": self._seq, "ts": time.time(), "rebase": covered_seq}
+            self._deltas = self._replay_after(covered_seq, txn["seq"])
+            return self._commit(txn, self._rebuild_live)
+
+    def _check_writable(self):
+        """Caller holds the lock."""
+        if self._closed:
+            raise RuntimeError("Leave ledger is closed.")
+        if self._broken is not None:
+            raise RuntimeError(f"Leave ledger stopped accepting writes after a failed write: {self._broken}")
+
+    def _commit(self, txn: Dict[str, Any], undo: Callable[[], None]) -> Dict[str, Any]:
+        """Queue a transaction already applied in memory and wait until it is durable. Caller holds the lock."""
+        self._log_txns.append(txn)
+        if self._writer is None:
+            self._apply_durable(txn)
+            self._durable_seq = self._seq
+            self._committed += 1
+            return txn
+        pending = _PendingWrite(txn, undo)
+        self._pending.append(pending)
+        self._cond.notify_all()
+
+        while not pending.done:
+            self._cond.wait()
+
+        if pending.error is not None:
+            raise pending.error
+        return txn
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                batch, self._pending = self._pending, []
+
+            error = self._broken
+            if error is None:
+                try:
+                    self._write_batch("".join(json.dumps(p.txn) + "\n" for p in batch).encode("utf-8"))
+                except OSError as e:
+                    error = e
+
+            with self._cond:
+                for p in reversed(batch) if error is not None else batch:
+                    if error is None:
+                        self._apply_durable(p.txn)
+                    else:
+                        # Never acknowledged, so undo the optimistic in-memory update (newest first)
+                        self._log_txns.remove(p.txn)
+                        p.undo()
+                        p.error = error
+                    p.done = True
+                if error is None:
+                    self._durable_seq = batch[-1].txn["seq"]
+                    self._since_snapshot += len(batch)
+                    self._committed += len(batch)
+                    self._batches += 1
+                self._cond.notify_all()
+
+            if error is not None:
+                print(f"❌ Leave ledger write failed: {error}")
+            elif self._since_snapshot >= self.snapshot_every:
+                try:
+                    self._compact()
+                except OSError as e:
+                    print(f"❌ Leave ledger compaction failed: {e}")
+
+    def _write_batch(self, data: bytes):
+        """Append and fsync data, or leave the log as it was before the batch. Writer thread only."""
+        offset = os.fstat(self._fd).st_size
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._fd, view):]
+            os.fsync(self._fd)
+        except OSError:
+            # Part of the batch may already be in the log; cut it off so it is
+            # not replayed after a restart, since its callers get an error
+            try:
+                os.ftruncate(self._fd, offset)
+                os.fsync(self._fd)
+            except OSError as e:
+                with self._cond:
+                    self._broken = e
+                print(f"❌ Leave ledger could not roll back a failed write, refusing further writes: {e}")
+            raise
+
+    def close(self):
+        """Flush outstanding writes and stop the writer thread"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # releases the flock
+            self._lock_fd = None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def deltas_for(self, employee: Dict[str, Any]) -> Dict[str, float]:
+        """Accumulated column changes recorded for an employee"""
+        with self._cond:
+            return dict(self._deltas.get(employee_key(employee), {}))
+
+    def live_value(self, employee: Dict[str, Any], column: str):
+        """Uploaded value of `column` with recorded transactions applied"""
+        change = self._deltas.get(employee_key(employee), {}).get(column)
+        if change is None:
+            return employee.get(column)
+        return as_number(employee.get(column)) + change
+
+    def live_record(self, employee: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of the employee record with live balances (the record itself if unchanged)"""
+        deltas = self.deltas_for(employee)
+        if not deltas:
+            return employee
+        live = dict(employee)
+        for col, change in deltas.items():
+            live[col] = as_number(employee.get(col)) + change
+        return live
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "transactions": self._seq,
+                "durable_transactions": self._durable_seq,
+                "durable": self._writer is not None,
+                "group_commits": self._batches,
+                "avg_batch_size": round(self._committed / self._batches, 2) if self._batches else 0,
+                "snapshots": self._snapshots,
+                "employees_with_activity": len(self._deltas),
+            }
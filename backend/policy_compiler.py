@@ -0,0 +1,136 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+                "eight": 8, "nine": 9, "ten": 10, "twelve": 12, "twenty": 20, "thirty": 30}
+NUM = r"(\d+(?:\.\d+)?|" + "|".join(NUMBER_WORDS) + r")"
+
+
+class PolicyRules(BaseModel):
+    """Rule parameters compiled from the uploaded policy document (None = not stated)"""
+    pl_quota_days: Optional[float] = None
+    sl_cl_quota_days: Optional[float] = None
+    min_notice_days: Optional[float] = None
+    block_on_pending_tasks: bool = False
+    lop_accrual_pause_days: float = 30
+    lta_min_continuous_pl_days: Optional[float] = None
+    max_carry_forward_days: Optional[float] = None
+    medical_certificate_after_days: Optional[float] = None
+    public_holidays: Optional[float] = None
+
+
+def _number(token: str) -> float:
+    token = token.lower()
+    return float(NUMBER_WORDS[token]) if token in NUMBER_WORDS else float(token)
+
+
+# rule -> regexes whose first group is the value; tried in order, first match wins
+NUMERIC_PATTERNS = {
+    "pl_quota_days": [
+        NUM + r" (?:paid|privilege|earned) leave days (?:per|a|every) (?:year|annum)",
+        r"quota of " + NUM + r" (?:paid |privilege |earned )?(?:leave )?days",
+        r"privilege leave.{0,600}?entitlement:? " + NUM + r" (?:working )?days",
+    ],
+    "sl_cl_quota_days": [
+        r"(?:casual|sick) leave.{0,400}?entitlement:? " + NUM + r" (?:working )?days",
+        NUM + r" (?:casual|sick|sick/casual|casual/sick) leave days (?:per|a|every) (?:year|annum)",
+    ],
+    "min_notice_days": [
+        r"(?:at least |minimum of |minimum )?" + NUM + r" (?:working |calendar )?days?'?s? (?:prior |advance )?notice",
+        r"notice (?:period )?of (?:at least )?" + NUM + r" (?:working |calendar )?days",
+    ],
+    "lta_min_continuous_pl_days": [
+        NUM + r" days continuous leave[^.]{0,80}?(?:lta|leave travel allowance)",
+        r"(?:lta|leave travel allowance) (?:needs|requires) " + NUM + r"\+? (?:or more )?continuous",
+    ],
+    "max_carry_forward_days": [
+        r"carr(?:y|ied) forward[^.]{0,200}?(?:not exceed|maximum of|up to|upto) " + NUM + r" days",
+    ],
+    "medical_certificate_after_days": [
+        NUM + r" days or more[^.]{0,60}?sick",
+    ],
+    "public_holidays": [
+        NUM + r" (?:days of )?(?:declared )?public holidays?",
+    ],
+}
+
+LOP_PATTERN = re.compile(r"lop ?(?:>|exceeding|of more than|more than|over) ?" + NUM + r" ?(month|day)s?", re.I)
+TASK_SENTENCE = re.compile(r"[^.\n]*\b(?:unresolved|pending|open|incomplete)\b[^.\n]*\btasks?\b[^.\n]*", re.I)
+NEGATION = re.compile(r"\b(?:cannot|can ?not|not be|not allowed|no leave)\b", re.I)
+
+
+def _snippet(text: str, start: int, end: int) -> str:
+    return text[max(0, start - 40):min(len(text), end + 40)].strip()
+
+
+def compile_policy(text: str) -> Tuple[PolicyRules, List[Dict[str, Any]]]:
+    """Extract rule parameters from policy text.
+
+    Returns the typed rules plus a report of every recognized rule with the
+    text it was taken from, so HR can check what the rule engine will enforce.
+    """
+    flat = re.sub(r"\s+", " ", text or "")
+    values: Dict[str, Any] = {}
+    report: List[Dict[str, Any]] = []
+
+    for rule, patterns in NUMERIC_PATTERNS.items():
+        for pattern in patterns:
+            match = re.search(pattern, flat, re.I)
+            if match:
+                values[rule] = _number(match.group(1))
+                report.append({"rule": rule, "value": values[rule], "source": _snippet(flat, match.start(), match.end())})
+                break
+
+    match = LOP_PATTERN.search(flat)
+    if match:
+        amount = _number(match.group(1))
+        values["lop_accrual_pause_days"] = amount * 30 if match.group(2).lower() == "month" else amount
+        report.append({"rule": "lop_accrual_pause_days", "value": values["lop_accrual_pause_days"],
+                       "source": _snippet(flat, match.start(), match.end())})
+
+    for match in TASK_SENTENCE.finditer(flat):
+        if NEGATION.search(match.group(0)):
+            values["block_on_pending_tasks"] = True
+            report.append({"rule": "block_on_pending_tasks", "value": True, "source": match.group(0).strip()})
+            break
+
+    return PolicyRules(**values), report
+
+
+def answer_policy_question(rules: PolicyRules, question_lower: str) -> Optional[str]:
+    """Answer questions about policy parameters directly from the compiled rules"""
+    if 'lta' in question_lower or 'leave travel' in question_lower:
+        if rules.lta_min_continuous_pl_days is not None:
+            return f"📋 Policy: Leave Travel Allowance (LTA) requires at least {rules.lta_min_continuous_pl_days:g} continuous Privilege Leave days."
+    if 'carry forward' in question_lower or 'carry over' in question_lower:
+        if rules.max_carry_forward_days is not None:
+            return f"📋 Policy: Unused Privilege Leave can be carried forward up to a maximum of {rules.max_carry_forward_days:g} days."
+    if 'notice' in question_lower or 'advance' in question_lower:
+        if rules.min_notice_days is not None:
+            return f"📋 Policy: Leave must be applied for at least {rules.min_notice_days:g} days in advance."
+    if 'public holiday' in question_lower:
+        if rules.public_holidays is not None:
+            return f"📋 Policy: There are {rules.public_holidays:g} declared public holidays per year."
+    if 'medical certificate' in question_lower or 'doctor' in question_lower:
+        if rules.medical_certificate_after_days is not None:
+            return f"📋 Policy: A medical certificate may be required for sick leave of {rules.medical_certificate_after_days:g} days or more at a stretch."
+    if 'task' in question_lower and rules.block_on_pending_tasks:
+        return "📋 Policy: Leave cannot be taken while there are unresolved critical tasks."
+    if any(word in question_lower for word in ['quota', 'entitlement', 'entitled', 'per year', 'per annum', 'annual']):
+        words = set(re.findall(r"[a-z]+", question_lower))
+        if 'pl' in words or 'privilege' in words:
+            if rules.pl_quota_days is not None:
+                return f"📋 Policy: Privilege Leave entitlement is {rules.pl_quota_days:g} days per year."
+        elif words & {'casual', 'sick', 'cl', 'sl'}:
+            if rules.sl_cl_quota_days is not None:
+                return f"📋 Policy: Casual/Sick Leave entitlement is {rules.sl_cl_quota_days:g} days per year."
+        elif rules.pl_quota_days is not None or rules.sl_cl_quota_days is not None:
+            parts = []
+            if rules.pl_quota_days is not None:
+                parts.append(f"Privilege Leave: {rules.pl_quota_days:g} days")
+            if rules.sl_cl_quota_days is not None:
+                parts.append(f"Casual/Sick Leave: {rules.sl_cl_quota_days:g} days")
+            return "📋 Policy: Annual leave entitlement — " + ", ".join(parts) + "."
+    return None
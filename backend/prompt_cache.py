@@ -0,0 +1,266 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from leave_ledger import employee_key
+
+CONTEXT_PREFIX = "Employee Information: "
+CONTEXT_POLICY_SEPARATOR = ". Company Policy: "
+POLICY_EXCERPT_CHARS = 600
+MAX_ANSWER_TOKENS = 30
+
+
+class Tokens(NamedTuple):
+    ids: np.ndarray                    # token IDs without special tokens
+    offsets: Optional[np.ndarray]      # (n, 2) character spans in the source text; None for slow tokenizers
+
+
+class EmployeeFragment(NamedTuple):
+    summary: str                       # "Key: value. Key: value" for model prompts
+    info_block: str                    # "• Key: value" lines for the fallback answer
+    tokens: Optional[Tokens]           # summary tokenized without special tokens
+
+
+class QAContext(NamedTuple):
+    """Tokenized create_qa_context text, with offsets back into `text`"""
+    text: str
+    ids: np.ndarray
+    offsets: Optional[np.ndarray]
+
+
+class PromptSnapshot(NamedTuple):
+    """Picklable view of the cache for one request, sent to model replica processes"""
+    policy_text: str
+    policy_excerpt: str
+    context: Optional[QAContext]
+
+    def qa_context(self, fragment: EmployeeFragment) -> Optional[QAContext]:
+        return self.context
+
+
+def format_employee_fields(employee: Dict[str, Any]) -> List[tuple]:
+    """(Title Cased Key, value) pairs for every non-empty field"""
+    fields = []
+    for key, value in employee.items():
+        if value != '' and value is not None and not pd.isna(value):
+            fields.append((key.replace('_', ' ').title(), value))
+    return fields
+
+
+class PromptFragmentCache:
+    """Per-employee prompt text and token IDs, built once when a dataset is published.
+
+    Fragments are cached per published row (several rows may share an
+    emp_id) and reflect live balances: the ledger listener drops the rows of
+    an employee whose balance changed, and they are rebuilt on the next
+    lookup. Model prompts are then assembled by concatenating cached token
+    sequences instead of re-formatting and re-tokenizing the record.
+    """
+
+    def __init__(self, live_record: Callable[[Dict[str, Any]], Dict[str, Any]], tokenizer=None):
+        self._live_record = live_record
+        self.tokenizer = tokenizer
+        self._lock = threading.Lock()
+        # Keyed by id() of a published record; _employees keeps those records alive
+        self._fragments: Dict[int, EmployeeFragment] = {}
+        self._rows_by_key: Dict[str, List[int]] = {}
+        self._employees: List[Dict[str, Any]] = []
+        self._generation = 0  # bumped by invalidate, so stale rebuilds are not stored
+        self._prefix_tokens = self._tokenize([CONTEXT_PREFIX], tokenizer)[0]
+        self._separator_tokens = self._tokenize([CONTEXT_POLICY_SEPARATOR], tokenizer)[0]
+        self._policy_tokens = self._tokenize([""], tokenizer)[0]
+        self.policy_text = ""
+        self.policy_excerpt = ""
+        self._hits = 0
+        self._misses = 0
+        self._publish_cpu_per_employee = 0.0
+        self._policy_cpu = 0.0
+
+    def _tokenize(self, texts: List[str], tokenizer) -> List[Optional[Tokens]]:
+        if tokenizer is None:
+            return [None] * len(texts)
+        with_offsets = getattr(tokenizer, "is_fast", False)
+        encoded = tokenizer(texts, add_special_tokens=False, return_offsets_mapping=with_offsets)
+        offsets = encoded["offset_mapping"] if with_offsets else [None] * len(texts)
+        return [Tokens(np.asarray(ids, dtype=np.int64),
+                       np.asarray(spans, dtype=np.int32).reshape(-1, 2) if spans is not None else None)
+                for ids, spans in zip(encoded["input_ids"], offsets)]
+
+    def _build(self, employees: List[Dict[str, Any]], tokenizer) -> List[EmployeeFragment]:
+        summaries, blocks = [], []
+        for employee in employees:
+            fields = format_employee_fields(self._live_record(employee))
+            summaries.append(". ".join(f"{key}: {value}" for key, value in fields))
+            blocks.append("\n".join(f"• {key}: {value}" for key, value in fields))
+        tokens = self._tokenize(summaries, tokenizer)
+        return [EmployeeFragment(s, b, t) for s, b, t in zip(summaries, blocks, tokens)]
+
+    def publish(self, employees: List[Dict[str, Any]]):
+        """Precompute fragments for a freshly uploaded dataset"""
+        while not self._publish(employees):
+            pass  # the tokenizer was switched mid-build
+
+    def _publish(self, employees: List[Dict[str, Any]], generation: Optional[int] = None) -> bool:
+        """Build and install fragments; False, installing nothing, if the tokenizer or
+        (when given) the generation changed during the build"""
+        tokenizer = self.tokenizer
+        started = time.process_time()
+        fragments = {id(emp): fragment for emp, fragment in zip(employees, self._build(employees, tokenizer))}
+        rows_by_key: Dict[str, List[int]] = {}
+        for emp in employees:
+            rows_by_key.setdefault(employee_key(emp), []).append(id(emp))
+        elapsed = time.process_time() - started
+        with self._lock:
+            if self.tokenizer is not tokenizer or generation not in (None, self._generation):
+                return False
+            self._fragments = fragments
+            self._rows_by_key = rows_by_key
+            self._employees = employees
+            self._generation += 1
+            self._publish_cpu_per_employee = elapsed / len(employees) if employees else 0.0
+        print(f"🧩 Precomputed prompt fragments for {len(fragments)} employees in {elapsed:.2f}s CPU")
+        return True
+
+    def set_policy(self, policy_text: str):
+        """Cache the policy excerpt (and its tokens) used in every QA context"""
+        while not self._set_policy(policy_text):
+            pass  # the tokenizer was switched mid-build
+
+    def _set_policy(self, policy_text: str, replacing: Optional[str] = None) -> bool:
+        """Tokenize and install the policy; False, installing nothing, if the tokenizer or
+        (when `replacing` is given) the installed policy changed meanwhile"""
+        tokenizer = self.tokenizer
+        started = time.process_time()
+        excerpt = policy_text[:POLICY_EXCERPT_CHARS] if len(policy_text) > POLICY_EXCERPT_CHARS else policy_text
+        policy_tokens = self._tokenize([excerpt], tokenizer)[0]
+        with self._lock:
+            if self.tokenizer is not tokenizer or replacing not in (None, self.policy_text):
+                return False
+            self.policy_text = policy_text
+            self.policy_excerpt = excerpt
+            self._policy_tokens = policy_tokens
+            self._policy_cpu = time.process_time() - started
+        return True
+
+    def set_tokenizer(self, tokenizer):
+        """Switch tokenizers (e.g. once a model finishes loading) and re-tokenize cached fragments"""
+        prefix_tokens = self._tokenize([CONTEXT_PREFIX], tokenizer)[0]
+        separator_tokens = self._tokenize([CONTEXT_POLICY_SEPARATOR], tokenizer)[0]
+        with self._lock:
+            self.tokenizer = tokenizer
+            self._prefix_tokens = prefix_tokens
+            self._separator_tokens = separator_tokens
+        # Re-tokenize what is installed now; if a publish or invalidation lands
+        # meanwhile, read the state again rather than overwrite it with stale data
+        while True:
+            with self._lock:
+                policy_text = self.policy_text
+            if self._set_policy(policy_text, replacing=policy_text):
+                break
+        while True:
+            with self._lock:
+                employees, generation = self._employees, self._generation
+            if not employees or self._publish(employees, generation):
+                break
+
+    def invalidate(self, employee: Dict[str, Any], *_):
+        """Drop the fragments of every row sharing this employee's ledger key (ledger listener)"""
+        with self._lock:
+            self._generation += 1
+            for row in self._rows_by_key.get(employee_key(employee), ()):
+                self._fragments.pop(row, None)
+
+    def get(self, employee: Dict[str, Any]) -> EmployeeFragment:
+        row = id(employee)
+        with self._lock:
+            fragment = self._fragments.get(row)
+            if fragment is not None:
+                self._hits += 1
+                return fragment
+            self._misses += 1
+            generation = self._generation
+            published = row in self._rows_by_key.get(employee_key(employee), ())
+        fragment = self._build([employee], self.tokenizer)[0]
+        with self._lock:
+            # Skip storing if the row changed while it was being built, or isn't a published row
+            if published and generation == self._generation:
+                self._fragments[row] = fragment
+        return fragment
+
+    def qa_context(self, fragment: EmployeeFragment) -> Optional[QAContext]:
+        """Tokenized create_qa_context text, assembled from cached token sequences"""
+        if fragment.tokens is None:
+            return None
+        with self._lock:
+            parts = [(CONTEXT_PREFIX, self._prefix_tokens), (fragment.summary, fragment.tokens),
+                     (CONTEXT_POLICY_SEPARATOR, self._separator_tokens), (self.policy_excerpt, self._policy_tokens)]
+        ids = np.concatenate([tokens.ids for _, tokens in parts])
+        offsets = None
+        if all(tokens.offsets is not None for _, tokens in parts):
+            shifted, start = [], 0
+            for text, tokens in parts:
+                shifted.append(tokens.offsets + start)
+                start += len(text)
+            offsets = np.concatenate(shifted)
+        return QAContext("".join(text for text, _ in parts), ids, offsets)
+
+    def snapshot(self, fragment: EmployeeFragment) -> PromptSnapshot:
+        return PromptSnapshot(self.policy_text, self.policy_excerpt, self.qa_context(fragment))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "fragments": len(self._fragments),
+                "token_ids_cached": self.tokenizer is not None,
+                "hits": self._hits,
+                "misses": self._misses,
+                # One-off precompute costs; bench_prompt_cache.py measures the per-request saving
+                "publish_cpu_per_employee_ms": round(self._publish_cpu_per_employee * 1000, 3),
+                "policy_tokenize_cpu_ms": round(self._policy_cpu * 1000, 3),
+            }
+
+
+def answer_from_token_ids(qa_pipeline, question: str, context: QAContext) -> Dict[str, Any]:
+    """Extractive QA over pre-tokenized context, bypassing the pipeline's tokenization"""
+    import torch
+
+    tokenizer, model = qa_pipeline.tokenizer, qa_pipeline.model
+    question_ids = tokenizer(question, add_special_tokens=False)["input_ids"]
+
+    # Leave room for the question and special tokens; the policy tail is dropped first
+    max_length = min(getattr(tokenizer, "model_max_length", 512), 512)
+    budget = max_length - len(question_ids) - tokenizer.num_special_tokens_to_add(pair=True)
+    offsets = context.offsets
+    context_ids = context.ids[:max(budget, 0)].tolist()
+
+    input_ids = tokenizer.build_inputs_with_special_tokens(question_ids, context_ids)
+    context_start = next(i for i in range(len(question_ids), len(input_ids) - len(context_ids) + 1)
+                         if input_ids[i:i + len(context_ids)] == context_ids)
+
+    inputs = {"input_ids": torch.tensor([input_ids]), "attention_mask": torch.ones(1, len(input_ids), dtype=torch.long)}
+    if "token_type_ids" in tokenizer.model_input_names:
+        inputs["token_type_ids"] = torch.tensor([tokenizer.create_token_type_ids_from_sequences(question_ids, context_ids)])
+
+    with torch.no_grad():
+        outputs = model(**inputs)
+
+    window = slice(context_start, context_start + len(context_ids))
+    start_logits = outputs.start_logits[0, window]
+    end_logits = outputs.end_logits[0, window]
+
+    # Best span with start <= end < start + MAX_ANSWER_TOKENS
+    positions = torch.arange(len(context_ids))
+    span_length = positions[None, :] - positions[:, None]
+    valid = (span_length >= 0) & (span_length < MAX_ANSWER_TOKENS)
+    scores = (start_logits[:, None] + end_logits[None, :]).masked_fill(~valid, float("-inf"))
+    best = int(torch.argmax(scores))
+    start, end = divmod(best, scores.shape[1])
+    if offsets is not None:
+        # Slice the original text, as the pipeline does, to keep its casing and spacing
+        answer = context.text[offsets[start][0]:offsets[end][1]]
+    else:
+        answer = tokenizer.decode(context_ids[start:end + 1], skip_special_tokens=True)
+    return {"answer": answer.strip(), "score": float(scores[start, end])}
@@ -0,0 +1,80 @@
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app_core import AppConfig, LeaveAssistant, create_app
+from policy_compiler import PolicyRules
+
+ROSTER = pd.DataFrame([
+    {"emp_id": "E1", "name": "Kai Le", "department": "Ops", "leave_balance_pl": 88, "total_pl_taken_this_year": 2},
+    {"emp_id": "E1", "name": "Kai Le", "department": "Ops", "leave_balance_pl": 12, "total_pl_taken_this_year": 2},
+    {"emp_id": "E2", "name": "Ana Ruiz", "department": "Ops", "leave_balance_pl": 5, "total_pl_taken_this_year": 0},
+])
+
+
+def pl_taken(assistant):
+    return assistant.analytics.query()["totals"]["pl_taken"]
+
+
+def test_republishing_folds_recorded_leave_once_per_employee():
+    assistant = LeaveAssistant(AppConfig(inference_backend="none", ledger_dir=None))
+    assistant.open()
+    assistant.publish_employees(ROSTER)
+    baseline = pl_taken(assistant)
+
+    assistant.ledger.apply_leave(assistant.find_employee("Kai Le"), "pl", 8)
+    assert pl_taken(assistant) == baseline + 8
+
+    assistant.publish_employees(ROSTER.copy())
+    assert pl_taken(assistant) == baseline + 8
+    assert assistant.ledger.live_value(assistant.find_employee("Kai Le"), "leave_balance_pl") == 80
+
+
+def test_upload_covering_the_ledger_drops_the_included_leave():
+    assistant = LeaveAssistant(AppConfig(inference_backend="none", ledger_dir=None))
+    assistant.open()
+    assistant.publish_employees(ROSTER)
+    assistant.ledger.apply_leave(assistant.find_employee("Ana Ruiz"), "pl", 2)
+
+    # HR's new export already deducted those two days
+    refreshed = ROSTER.copy()
+    refreshed.loc[2, "leave_balance_pl"] = 3
+    assistant.publish_employees(refreshed, ledger_covers_seq=1)
+    assert assistant.ledger.live_value(assistant.find_employee("Ana Ruiz"), "leave_balance_pl") == 3
+
+
+def test_apply_without_a_date_is_blocked_by_pending_tasks():
+    app = create_app(AppConfig(inference_backend="none", ledger_dir=None))
+    with TestClient(app) as client:
+        assistant = app.state.assistant
+        assistant.publish_employees(ROSTER.assign(pending_tasks=[0, 0, 3]))
+        assistant.policy_rules = PolicyRules(block_on_pending_tasks=True)
+
+        response = client.post("/apply", json={"employee_name": "Ana Ruiz", "leave_type": "pl", "days": 1})
+        assert response.status_code == 400
+        assert "3 pending task(s)" in response.json()["error"]
+        assert assistant.ledger.stats()["transactions"] == 0
+
+        response = client.post("/apply", json={"employee_name": "Kai Le", "leave_type": "pl", "days": 1})
+        assert response.status_code == 200
+
+
+def test_ask_deadline_is_validated_and_capped_at_the_budget(monkeypatch):
+    app = create_app(AppConfig(inference_backend="none", ledger_dir=None, latency_budget_ms=500,
+                               routing="model_first"))
+    with TestClient(app) as client:
+        assistant = app.state.assistant
+        assistant.publish_employees(ROSTER)
+        budgets = []
+
+        async def record_budget(fn, *args, deadline, budget, abandoned):
+            budgets.append(budget)
+            return None
+        monkeypatch.setattr(assistant.backend, "loaded", True)
+        monkeypatch.setattr(assistant.inference_queue, "run", record_budget)
+
+        for deadline_ms in (0, -5):
+            response = client.post("/ask", json={"employee_name": "Kai Le", "question": "hi", "deadline_ms": deadline_ms})
+            assert response.status_code == 400
+        for deadline_ms in (200, 60000, None):
+            client.post("/ask", json={"employee_name": "Kai Le", "question": "hi", "deadline_ms": deadline_ms})
+        assert budgets == [0.2, 0.5, 0.5]
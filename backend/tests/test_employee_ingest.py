@@ -0,0 +1,64 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from employee_ingest import load_employee_frame
+
+EMP_JSON = os.path.join(os.path.dirname(__file__), "..", "..", "emp.json")
+
+ROWS = [
+    {"Employee Name": "Kai Le", "Employee ID": "E1", "PL Balance": 12, "TasksPending": 2},
+    {"Employee Name": "Ana Ruiz", "Employee ID": "E2", "PL Balance": 5, "TasksPending": 0},
+]
+COLUMNS = ["name", "emp_id", "leave_balance_pl", "pending_tasks"]
+
+
+def assert_roster(df):
+    assert sorted(df.columns) == sorted(COLUMNS)
+    assert df.set_index("emp_id").loc["E1", "leave_balance_pl"] == 12
+    assert list(df["pending_tasks"]) == [2, 0]
+
+
+def test_sample_emp_json():
+    with open(EMP_JSON, "rb") as f:
+        content = f.read()
+    df = load_employee_frame("emp.json", content)
+    assert len(df) == len(json.loads(content))
+    assert {"name", "pending_tasks"} <= set(df.columns)
+    assert df.loc[0, "name"] == "Janhavi Gangawane"
+
+
+def test_json_wrapped_in_an_object():
+    df = load_employee_frame("roster.json", json.dumps({"employees": ROWS}).encode())
+    assert_roster(df)
+
+
+def test_ndjson():
+    pytest.importorskip("pyarrow")
+    content = "".join(json.dumps(row) + "\n" for row in ROWS).encode()
+    assert_roster(load_employee_frame("roster.ndjson", content))
+
+
+def test_parquet_keeps_a_named_index_as_a_column(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "roster.parquet"
+    pd.DataFrame(ROWS).set_index("Employee ID").to_parquet(path)
+    assert_roster(load_employee_frame("roster.parquet", path.read_bytes()))
+
+
+@pytest.mark.parametrize("ipc_format", ["file", "stream"])
+def test_arrow_ipc(ipc_format):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.Table.from_pylist(ROWS)
+    sink = pa.BufferOutputStream()
+    writer = pa.ipc.new_file if ipc_format == "file" else pa.ipc.new_stream
+    with writer(sink, table.schema) as w:
+        w.write_table(table)
+    assert_roster(load_employee_frame("roster.arrow", sink.getvalue().to_pybytes()))
+
+
+def test_unsupported_extension():
+    with pytest.raises(ValueError):
+        load_employee_frame("roster.txt", b"")
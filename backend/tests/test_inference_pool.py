@@ -0,0 +1,114 @@
+import os
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from inference_backends import InferenceBackend
+from inference_pool import InferencePool, PooledBackend, plan_cpu_sets
+from prompt_cache import PromptSnapshot
+
+
+class ScriptedBackend(InferenceBackend):
+    """Replica-side test double: the question says what to do"""
+    name = "scripted"
+
+    def load(self):
+        self.loaded = True
+        return True
+
+    def answer(self, question, fragment, cache, deadline=None):
+        if question == "crash":
+            os._exit(3)
+        if question == "hang":
+            time.sleep(3600)
+        return f"{question} from {os.getpid()}"
+
+
+class FlakyLoadBackend(InferenceBackend):
+    """Crashes while loading until it has tried twice; model_names[0] is a scratch directory"""
+    name = "flaky-load"
+
+    def load(self):
+        attempts = len(os.listdir(self.model_names[0]))
+        if attempts < 2:
+            open(os.path.join(self.model_names[0], str(attempts)), "w").close()
+            os._exit(4)
+        self.loaded = True
+        return True
+
+
+class MissingModelBackend(InferenceBackend):
+    name = "missing-model"
+
+    def load(self):
+        return False
+
+
+class Cache:
+    def snapshot(self, fragment):
+        return PromptSnapshot("", "", None)
+
+
+@pytest.fixture
+def backend():
+    backend = PooledBackend(ScriptedBackend, replicas=2)
+    backend.pool.monitor_interval, backend.pool.hang_grace = 0.1, 0.5
+    assert backend.load()
+    yield backend
+    backend.pool.close()
+
+
+def wait_for(condition, timeout=30):
+    started = time.time()
+    while not condition():
+        assert time.time() - started < timeout
+        time.sleep(0.05)
+
+
+def test_plan_cpu_sets_gives_replicas_disjoint_cores():
+    assert plan_cpu_sets(2, 2, [0, 1, 2, 3]) == [[0, 1], [2, 3]]
+    assert plan_cpu_sets(3, 1, [0, 1]) == [[0], [1], [0]]
+
+
+def test_requests_are_spread_over_replicas(backend):
+    futures = [backend.pool.submit(f"q{i}", None, Cache().snapshot(None)) for i in range(20)]
+    assert len({future.result(timeout=10).split(" from ")[1] for future in futures}) == 2
+
+
+def test_crashed_replica_fails_its_request_and_restarts(backend):
+    with pytest.raises(RuntimeError, match="crashed"):
+        backend.answer("crash", None, Cache(), deadline=time.time() + 10)
+    wait_for(lambda: backend.pool.stats()["restarts"] == 1 and all(r["loaded"] for r in backend.pool.stats()["replicas"]))
+    assert backend.answer("ok", None, Cache(), deadline=time.time() + 10).startswith("ok")
+
+
+def test_hung_replica_times_out_and_is_replaced(backend):
+    started = time.time()
+    with pytest.raises(TimeoutError):
+        backend.answer("hang", None, Cache(), deadline=time.time() + 0.3)
+    assert time.time() - started < 2
+    wait_for(lambda: backend.pool.stats()["restarts"] == 1 and all(r["loaded"] for r in backend.pool.stats()["replicas"]))
+    assert backend.pool.stats()["failed"] == 1
+
+
+def test_replica_dying_while_loading_is_restarted_with_backoff(tmp_path):
+    pool = InferencePool(FlakyLoadBackend, [str(tmp_path)], replicas=1, monitor_interval=0.1)
+    try:
+        assert not pool.start()
+        wait_for(lambda: pool.stats()["replicas"][0]["loaded"])
+        assert pool.stats()["restarts"] == 2
+    finally:
+        pool.close()
+
+
+def test_replica_whose_model_failed_to_load_is_not_restarted():
+    pool = InferencePool(MissingModelBackend, replicas=1, monitor_interval=0.1)
+    try:
+        assert not pool.start()
+        time.sleep(0.5)
+        assert pool.stats()["restarts"] == 0
+        with pytest.raises(RuntimeError):
+            pool.submit("q", None, None)
+    finally:
+        pool.close()
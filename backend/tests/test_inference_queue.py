@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+from inference_queue import InferenceQueue, LoadShed
+
+
+def call(queue, seconds, budget):
+    async def go():
+        return await queue.run(time.sleep, seconds, budget=budget)
+    return asyncio.run(go())
+
+
+def wait_idle(queue):
+    while queue.stats()["queue_depth"]:
+        time.sleep(0.01)
+
+
+def test_admission_recovers_after_one_slow_call():
+    queue = InferenceQueue(workers=1, max_depth=4)
+    with pytest.raises(LoadShed, match="timed_out"):
+        call(queue, 0.3, budget=0.2)
+    wait_idle(queue)
+    assert queue.estimated_wait() > 0.2
+
+    # The idle queue admits a probe; fast calls pull the average back under budget
+    for _ in range(6):
+        call(queue, 0.05, budget=0.2)
+    stats = queue.stats()
+    assert stats["admitted"] == 7
+    assert stats["completed"] == 6
+    assert stats["shed_over_budget"] == 0
+    assert queue.estimated_wait() < 0.2
+
+
+def test_busy_queue_still_sheds_over_budget():
+    queue = InferenceQueue(workers=1, max_depth=4)
+    call(queue, 0.2, budget=1.0)
+
+    async def go():
+        first = asyncio.ensure_future(queue.run(time.sleep, 0.2, budget=1.0))
+        await asyncio.sleep(0.02)
+        with pytest.raises(LoadShed, match="over_budget"):
+            await queue.run(time.sleep, 0.2, budget=0.1)
+        await first
+    asyncio.run(go())
+    assert queue.stats()["shed_over_budget"] == 1
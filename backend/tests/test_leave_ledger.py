@@ -0,0 +1,205 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from leave_ledger import LEDGER_FILE, SNAPSHOT_FILE, LeaveLedger, as_number
+
+EMPLOYEE = {"emp_id": "E1", "name": "Kai Le", "leave_balance_pl": 20, "total_pl_taken_this_year": 2}
+
+
+def reopen(path, **kwargs):
+    return LeaveLedger(str(path), **kwargs)
+
+
+def test_durable_transactions_replay_after_restart(tmp_path):
+    ledger = reopen(tmp_path)
+    ledger.apply_leave(EMPLOYEE, "pl", 3)
+    ledger.apply_leave(EMPLOYEE, "pl", 2)
+    ledger.close()
+
+    ledger = reopen(tmp_path)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 15
+    assert ledger.live_value(EMPLOYEE, "total_pl_taken_this_year") == 7
+    ledger.close()
+
+
+def test_torn_final_line_is_truncated(tmp_path):
+    ledger = reopen(tmp_path)
+    ledger.apply_leave(EMPLOYEE, "pl", 3)
+    ledger.close()
+    log_path = os.path.join(tmp_path, LEDGER_FILE)
+    intact = os.path.getsize(log_path)
+    with open(log_path, "ab") as f:
+        f.write(b'{"seq": 2, "employee": "E1", "deltas": {"leave_bal')  # crash mid-append
+
+    ledger = reopen(tmp_path)
+    assert os.path.getsize(log_path) == intact
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 17
+
+    # New appends land after the intact prefix and survive another restart
+    ledger.apply_leave(EMPLOYEE, "pl", 1)
+    ledger.close()
+    ledger = reopen(tmp_path)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 16
+    assert ledger.stats()["transactions"] == 2
+    ledger.close()
+
+
+def test_compaction_snapshots_and_truncates_the_log(tmp_path):
+    ledger = reopen(tmp_path, snapshot_every=2)
+    for _ in range(5):
+        ledger.apply_leave(EMPLOYEE, "pl", 1)
+    ledger.close()
+    assert ledger.stats()["snapshots"] >= 2
+
+    with open(os.path.join(tmp_path, SNAPSHOT_FILE), encoding="utf-8") as f:
+        snapshot = json.load(f)
+    with open(os.path.join(tmp_path, LEDGER_FILE), encoding="utf-8") as f:
+        logged = [json.loads(line)["seq"] for line in f]
+    assert all(seq > snapshot["seq"] for seq in logged)
+    assert snapshot["seq"] + len(logged) == 5
+
+    ledger = reopen(tmp_path)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 15
+    ledger.close()
+
+
+def test_crash_between_snapshot_and_truncate_does_not_double_count(tmp_path, monkeypatch):
+    ledger = reopen(tmp_path, snapshot_every=3)
+
+    def crash(fd, length):
+        raise OSError("simulated crash before truncate")
+    monkeypatch.setattr(os, "ftruncate", crash)
+    for _ in range(3):
+        ledger.apply_leave(EMPLOYEE, "pl", 1)
+    ledger.close()
+    monkeypatch.undo()
+
+    # The snapshot covers all three transactions and the log still holds them
+    with open(os.path.join(tmp_path, SNAPSHOT_FILE), encoding="utf-8") as f:
+        assert json.load(f)["seq"] == 3
+    with open(os.path.join(tmp_path, LEDGER_FILE), encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+
+    ledger = reopen(tmp_path)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 17
+    ledger.close()
+
+
+def test_failed_fsync_rolls_the_log_back(tmp_path, monkeypatch):
+    ledger = reopen(tmp_path)
+    ledger.apply_leave(EMPLOYEE, "pl", 1)
+    log_path = os.path.join(tmp_path, LEDGER_FILE)
+    intact = os.path.getsize(log_path)
+
+    real_fsync = os.fsync
+    failures = [OSError("simulated fsync failure")]
+
+    def flaky_fsync(fd):
+        if failures:
+            raise failures.pop()
+        real_fsync(fd)
+    monkeypatch.setattr(os, "fsync", flaky_fsync)
+    with pytest.raises(OSError):
+        ledger.apply_leave(EMPLOYEE, "pl", 5)
+    assert os.path.getsize(log_path) == intact
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 19
+
+    ledger.apply_leave(EMPLOYEE, "pl", 2)
+    ledger.close()
+    ledger = reopen(tmp_path)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 17
+    ledger.close()
+
+
+def test_stops_writing_when_a_failed_write_cannot_be_rolled_back(tmp_path, monkeypatch):
+    ledger = reopen(tmp_path)
+
+    def fail(*args):
+        raise OSError("simulated disk failure")
+    monkeypatch.setattr(os, "fsync", fail)
+    monkeypatch.setattr(os, "ftruncate", fail)
+    with pytest.raises(OSError):
+        ledger.apply_leave(EMPLOYEE, "pl", 5)
+    monkeypatch.undo()
+
+    with pytest.raises(RuntimeError):
+        ledger.apply_leave(EMPLOYEE, "pl", 1)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 20
+    ledger.close()
+
+
+@pytest.mark.parametrize("days", [0, -1, float("nan"), float("inf")])
+def test_rejects_non_positive_or_non_finite_days(tmp_path, days):
+    ledger = reopen(tmp_path)
+    with pytest.raises(ValueError):
+        ledger.apply_leave(EMPLOYEE, "pl", days)
+    ledger.close()
+    assert os.path.getsize(os.path.join(tmp_path, LEDGER_FILE)) == 0
+
+
+def test_rebase_keeps_only_transactions_after_the_covered_seq(tmp_path):
+    ledger = reopen(tmp_path)
+    ledger.apply_leave(EMPLOYEE, "pl", 8)  # seq 1
+    ledger.apply_leave(EMPLOYEE, "pl", 2)  # seq 2
+
+    # HR's refreshed export already includes seq 1; seq 2 still has to be applied
+    ledger.rebase(1)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 18
+    ledger.apply_leave(EMPLOYEE, "pl", 1)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 17
+    ledger.close()
+
+    ledger = reopen(tmp_path)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 17
+    ledger.close()
+
+
+def test_rebase_survives_compaction(tmp_path):
+    ledger = reopen(tmp_path, snapshot_every=2)
+    for _ in range(3):
+        ledger.apply_leave(EMPLOYEE, "pl", 1)
+    ledger.rebase(3)
+    ledger.apply_leave(EMPLOYEE, "pl", 2)
+    ledger.close()
+
+    ledger = reopen(tmp_path)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 18
+    ledger.close()
+
+
+@pytest.mark.parametrize("covered_seq", [-1, 3])
+def test_rebase_rejects_an_unknown_seq(tmp_path, covered_seq):
+    ledger = reopen(tmp_path)
+    ledger.apply_leave(EMPLOYEE, "pl", 1)
+    with pytest.raises(ValueError):
+        ledger.rebase(covered_seq)
+    assert ledger.live_value(EMPLOYEE, "leave_balance_pl") == 19
+    ledger.close()
+
+
+def test_second_process_cannot_open_the_same_ledger(tmp_path):
+    ledger = reopen(tmp_path)
+    with pytest.raises(RuntimeError):
+        reopen(tmp_path)  # a separate open file description conflicts like another process
+    ledger.close()
+
+    ledger = reopen(tmp_path)
+    ledger.close()
+
+
+def test_memory_only_ledger(tmp_path):
+    ledger = LeaveLedger(None)
+    ledger.apply_leave(EMPLOYEE, "pl", 4)
+    assert ledger.live_record(EMPLOYEE)["leave_balance_pl"] == 16
+    with pytest.raises(ValueError):
+        ledger.apply_leave(EMPLOYEE, "pl", 17)
+    ledger.close()
+
+
+@pytest.mark.parametrize("cell, number", [(3, 3.0), ("2.5", 2.5), ("", 0.0), (None, 0.0), ("n/a", 0.0),
+                                          (float("nan"), 0.0), (pd.NA, 0.0)])
+def test_as_number_treats_blank_cells_as_zero(cell, number):
+    assert as_number(cell) == number
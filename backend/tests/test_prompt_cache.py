@@ -0,0 +1,103 @@
+import pytest
+
+from prompt_cache import CONTEXT_PREFIX, PromptFragmentCache
+
+ROWS = [
+    {"emp_id": "E1", "name": "Kai Le", "leave_balance_pl": 88},
+    {"emp_id": "E1", "name": "Kai Le", "leave_balance_pl": 12},
+    {"emp_id": "E2", "name": "Ana Ruiz", "leave_balance_pl": 5},
+]
+
+
+def test_rows_sharing_an_emp_id_keep_their_own_fragment():
+    cache = PromptFragmentCache(lambda emp: emp)
+    cache.publish(ROWS)
+    assert cache.stats()["fragments"] == 3
+    assert "Leave Balance Pl: 88" in cache.get(ROWS[0]).summary
+    assert "Leave Balance Pl: 12" in cache.get(ROWS[1]).summary
+
+
+def test_invalidate_drops_every_row_of_the_employee():
+    live = {}
+    cache = PromptFragmentCache(lambda emp: {**emp, **live.get(emp["emp_id"], {})})
+    cache.publish(ROWS)
+    live["E1"] = {"leave_balance_pl": 80}
+    cache.invalidate(ROWS[0], {}, {})
+    assert cache.stats()["fragments"] == 1
+    assert "Leave Balance Pl: 80" in cache.get(ROWS[1]).summary
+
+
+def test_fragment_built_during_an_invalidation_is_not_stored():
+    live = {}
+    cache = PromptFragmentCache(lambda emp: {**emp, **live.get(emp["emp_id"], {})})
+    cache.publish(ROWS)
+    cache.invalidate(ROWS[2], {}, {})
+
+    def racing_live_record(emp):
+        record = {**emp, **live.get(emp["emp_id"], {})}
+        live["E2"] = {"leave_balance_pl": 1}  # a ledger change lands mid-build
+        cache.invalidate(emp, {}, {})
+        return record
+    cache._live_record = racing_live_record
+    assert "Leave Balance Pl: 5" in cache.get(ROWS[2]).summary
+
+    cache._live_record = lambda emp: {**emp, **live.get(emp["emp_id"], {})}
+    assert "Leave Balance Pl: 1" in cache.get(ROWS[2]).summary
+
+
+class WordTokenizer:
+    """One id per word; `during` runs once when the tokenizer first sees `trigger`"""
+
+    def __init__(self, trigger=None, during=None):
+        self.trigger, self.during = trigger, during
+
+    def __call__(self, texts, add_special_tokens, return_offsets_mapping):
+        if self.during and self.trigger in texts:
+            during, self.during = self.during, None
+            during()
+        return {"input_ids": [[len(word) for word in text.split()] for text in texts]}
+
+
+def test_set_tokenizer_does_not_install_fragments_built_before_an_invalidation():
+    live = {}
+    cache = PromptFragmentCache(lambda emp: {**emp, **live.get(emp["emp_id"], {})})
+    cache.publish(ROWS)
+
+    def ledger_change():
+        live["E2"] = {"leave_balance_pl": 1}
+        cache.invalidate(ROWS[2], {}, {})
+    cache.set_tokenizer(WordTokenizer(cache.get(ROWS[2]).summary, ledger_change))
+
+    assert cache.stats()["fragments"] == 3
+    fragment = cache.get(ROWS[2])
+    assert "Leave Balance Pl: 1" in fragment.summary and fragment.tokens is not None
+
+
+def test_set_tokenizer_keeps_a_policy_set_meanwhile():
+    cache = PromptFragmentCache(lambda emp: emp)
+    cache.set_policy("old policy")
+    cache.set_tokenizer(WordTokenizer("old policy", lambda: cache.set_policy("new policy")))
+    assert cache.policy_text == "new policy"
+    assert cache.snapshot(cache.get(ROWS[0])).context.text.endswith("new policy")
+
+
+def test_qa_context_offsets_point_into_the_original_text():
+    tokenizers = pytest.importorskip("tokenizers")
+    transformers = pytest.importorskip("transformers")
+
+    words = "employee information company policy kai le leave balance pl name emp id ana ruiz e1 e2 : . 88 12 5 20 days".split()
+    vocab = {token: i for i, token in enumerate(["[PAD]", "[UNK]", "[CLS]", "[SEP]"] + words)}
+    backend = tokenizers.Tokenizer(tokenizers.models.WordPiece(vocab, unk_token="[UNK]"))
+    backend.normalizer = tokenizers.normalizers.BertNormalizer(lowercase=True)
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.BertPreTokenizer()
+    tokenizer = transformers.PreTrainedTokenizerFast(tokenizer_object=backend, unk_token="[UNK]")
+
+    cache = PromptFragmentCache(lambda emp: emp, tokenizer=tokenizer)
+    cache.publish(ROWS)
+    cache.set_policy("PL: 20 days")
+    context = cache.qa_context(cache.get(ROWS[0]))
+
+    assert context.text == CONTEXT_PREFIX + cache.get(ROWS[0]).summary + ". Company Policy: PL: 20 days"
+    assert len(context.offsets) == len(context.ids)
+    spans = [context.text[start:end] for start, end in context.offsets]
+    assert "Kai" in spans and "Le" in spans and spans[-2:] == ["20", "days"]
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+from leave_ledger import LeaveLedger
+from policy_compiler import PolicyRules
+from rule_engine import DEFAULT_RULES, analyze_leave_request
+
+EMPLOYEE = {"name": "Kai Le", "leave_balance_pl": 88, "leave_balance_cl": 4, "leave_balance_sl": 3,
+            "lop_days": 0, "pending_tasks": 2}
+RULES = PolicyRules(pl_quota_days=20, sl_cl_quota_days=3, min_notice_days=7, block_on_pending_tasks=True)
+
+
+def ask(question):
+    return analyze_leave_request(EMPLOYEE, question, "policy text", RULES)
+
+
+def next_weekday(days_ahead):
+    day = datetime.now() + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day.strftime("%d/%m/%Y")
+
+
+def test_balance_questions_use_the_employee_balance():
+    assert "88" in ask("How many annual leave days do I have left?")
+    assert "88" in ask("What is my annual PL balance?")
+    assert "notice" not in ask("Can I get an advance on leave balance?")
+
+
+def test_dated_application_checks_this_employee():
+    answer = ask(f"Can I apply PL on {next_weekday(30)} even though I have pending tasks?")
+    assert "2 unresolved task(s)" in answer
+
+
+def test_policy_questions_still_answered_from_rules():
+    assert "20 days per year" in ask("What is the annual PL entitlement?")
+    assert "7 days in advance" in ask("How much notice is needed?")
+
+
+def test_combined_sl_cl_balance_reflects_recorded_leave():
+    employee = {"emp_id": "E1", "name": "Kai Le", "leave_balance_pl": 10, "leave_balance_sl_cl": 6}
+    ledger = LeaveLedger(None)
+    ledger.apply_leave(employee, "cl", 2)
+    answer = analyze_leave_request(employee, "What is my casual leave balance?", "", RULES, ledger)
+    assert "4.0 Casual Leave" in answer
+    answer = analyze_leave_request(employee, "Can I take leave?", "", DEFAULT_RULES, ledger)
+    assert "PL: 10.0, CL: 4.0, SL: 4.0" in answer
+
+
+def test_lop_recorded_in_the_ledger_pauses_pl_accrual():
+    employee = {"emp_id": "E1", "name": "Kai Le", "leave_balance_pl": 10, "lop_days": 3}
+    rules = PolicyRules(lop_accrual_pause_days=5)
+    ledger = LeaveLedger(None)
+    question = f"Can I apply PL on {next_weekday(30)}?"
+    assert "✅" in analyze_leave_request(employee, question, "", rules, ledger)
+
+    ledger.apply_leave(employee, "lop", 3)
+    assert "Current LOP: 6.0 days" in analyze_leave_request(employee, question, "", rules, ledger)